@@ -0,0 +1,314 @@
+"""
+Simulate many games in lockstep with NumPy arrays, to estimate the win rate of the greedy policy over many deals.
+NumPy is only needed by this module, the game doesn't depend on it.
+
+Usage: python src/BatchSim.py [--start N] [--count N] [--batch N] [--max-moves N] [--check N]
+"""
+
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+from DealGenerator import *
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STACK_SIZE = 52
+""" Greatest number of cards in a stack """
+
+STOCK = 7
+""" Index of the stack of remaining cards """
+
+COLLECTED = 8
+""" Stack index of the cards in completed sets """
+
+class BatchSim:
+    """
+    Represent a batch of games played in lockstep. The cards of all games are kept in arrays indexed by
+    game, and every step makes one move in each game that's still in progress.
+    """
+
+    def __init__(self, seeds: list[int]) -> None:
+        """
+        Deal the games of the given seeds.
+
+        Parameters:
+        - seeds: seeds of the deals, one game per seed
+        """
+        if np == None: raise ImportError("BatchSim needs NumPy, install it with 'pip install numpy'")
+        num = len(seeds)
+        self.num = num
+        """ Number of games """
+        self.table = np.full((num, 8, STACK_SIZE), -1, np.int8)
+        """ Card ids in stack 0-7 of each game, indexed by game, stack and position in the stack, -1 if empty """
+        self.lengths = np.zeros((num, 8), np.int64)
+        """ Number of cards in stack 0-7 of each game """
+        self.where = np.zeros((num, CARD_NUM), np.int64)
+        """ Stack index of each card of each game, COLLECTED if the card is in a completed set """
+        self.index = np.zeros((num, CARD_NUM), np.int64)
+        """ Position of each card of each game in its stack """
+        self.hidden = np.zeros((num, CARD_NUM), bool)
+        """ Whether each card of each game is faced down """
+        self.win_num = np.zeros(num, np.int64)
+        """ Number of completed sets of each game """
+        self.moves = np.zeros(num, np.int64)
+        """ Number of moves made in each game """
+        self.active = np.ones(num, bool)
+        """ Whether each game is still in progress """
+        self.deal(seeds)
+
+    def deal(self, seeds: list[int]) -> None:
+        """
+        Deal the cards of each game, the same deal as CardSet.deal() with the same seed.
+
+        Parameters:
+        - seeds: seeds of the deals
+        """
+        ids = np.frombuffer(b"".join(generate_deal(s).data[:CARD_NUM] for s in seeds), np.int8)
+        ids = ids.reshape(self.num, CARD_NUM).astype(np.int64)
+        games = np.arange(self.num)[:, None]
+        positions = np.arange(CARD_NUM)
+        stacks = np.minimum(positions // 7, STOCK)
+        indices = np.where(positions < 49, positions % 7, positions - 49)
+        self.table[games, stacks, indices] = ids
+        self.lengths[:] = list(DEAL_LENGTHS[:8])
+        self.where[games, ids] = stacks
+        self.index[games, ids] = indices
+        self.hidden[games, ids[:, HIDDEN_POS]] = True
+
+    def tops(self, games: "np.ndarray", stacks: "np.ndarray") -> "np.ndarray":
+        """
+        Parameters:
+        - games: indices of games
+        - stacks: index of a stack of each game
+
+        Return:
+        The card on the top of each stack, -1 if the stack is empty
+        """
+        length = self.lengths[games, stacks]
+        top = self.table[games, stacks, np.maximum(length - 1, 0)].astype(np.int64)
+        return np.where(length > 0, top, -1)
+
+    def reveal(self, games: "np.ndarray", stacks: "np.ndarray") -> None:
+        """
+        Face up the card on the top of each stack, if any.
+
+        Parameters:
+        - games: indices of games
+        - stacks: index of a stack of each game
+        """
+        top = self.tops(games, stacks)
+        self.hidden[games[top >= 0], top[top >= 0]] = False
+
+    def greedy_moves(self, games: "np.ndarray") -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        Find the move given by CardSet.hint() in each game: 'King' to the leftmost empty stack, moves to
+        the stacks from left to right, and dealing the remaining cards.
+
+        Parameters:
+        - games: indices of games
+
+        Return:
+        The source stack, destination stack and position of the first card moved of each game.
+        The source is STOCK for dealing the remaining cards and -1 if there's no move.
+        """
+        rows = games[:, None]
+        src = np.full(len(games), -1, np.int64)
+        dest = np.zeros(len(games), np.int64)
+        start = np.zeros(len(games), np.int64)
+
+        # Dealing the remaining cards
+        deal = self.lengths[games, STOCK] == 3
+        src[deal] = STOCK
+
+        # Moves onto stack 0-6, the leftmost one is preferred
+        tops = self.tops(np.repeat(games, 7), np.tile(np.arange(7), len(games))).reshape(-1, 7)
+        lower = np.maximum(tops - 1, 0)
+        lower_stack = self.where[rows, lower]
+        onto = (tops >= 0) & (tops % 13 != 0) & ~self.hidden[rows, lower] & (lower_stack < 7) \
+            & (lower_stack != np.arange(7))
+        found = onto.any(axis=1)
+        i = onto.argmax(axis=1)
+        card = lower[np.arange(len(games)), i]
+        src[found] = lower_stack[np.arange(len(games)), i][found]
+        dest[found] = i[found]
+        start[found] = self.index[games, card][found]
+
+        # 'King' to the leftmost empty stack, kings are tried in the order of types
+        empty = self.lengths[games, :7] == 0
+        kings = np.arange(4) * 13 + 12
+        movable = ~self.hidden[rows, kings] & (self.where[rows, kings] < 7) & (self.index[rows, kings] != 0) \
+            & empty.any(axis=1)[:, None]
+        found = movable.any(axis=1)
+        king = kings[movable.argmax(axis=1)]
+        src[found] = self.where[games, king][found]
+        dest[found] = empty.argmax(axis=1)[found]
+        start[found] = self.index[games, king][found]
+        return src, dest, start
+
+    def move_cards(self, games: "np.ndarray", src: "np.ndarray", dest: "np.ndarray", start: "np.ndarray") -> None:
+        """
+        Move the cards from a position to the top of a stack onto another stack in each game, and reveal
+        the card left on the top of the source stack. The moves are not checked.
+
+        Parameters:
+        - games: indices of games
+        - src: the source stack of each game
+        - dest: the destination stack of each game
+        - start: position of the first card moved of each game
+        """
+        src_length = self.lengths[games, src]
+        dest_length = self.lengths[games, dest]
+        positions = np.arange(STACK_SIZE)
+        moved = (positions >= start[:, None]) & (positions < src_length[:, None])
+        k, j = np.nonzero(moved)
+        g = games[k]
+        cards = self.table[g, src[k], j]
+        new_j = dest_length[k] + j - start[k]
+        self.table[g, dest[k], new_j] = cards
+        self.table[g, src[k], j] = -1
+        self.where[g, cards] = dest[k]
+        self.index[g, cards] = new_j
+        self.lengths[games, src] = start
+        self.lengths[games, dest] = dest_length + src_length - start
+        self.reveal(games, src)
+
+    def deal_remaining(self, games: "np.ndarray") -> None:
+        """
+        Deal the remaining cards to the first three stacks of each game, one card per stack.
+
+        Parameters:
+        - games: indices of games whose remaining cards are not dealt
+        """
+        for i in reversed(range(3)):
+            card = self.table[games, STOCK, i].astype(np.int64)
+            length = self.lengths[games, i]
+            self.table[games, i, length] = card
+            self.table[games, STOCK, i] = -1
+            self.where[games, card] = i
+            self.index[games, card] = length
+            self.hidden[games, card] = False
+            self.lengths[games, i] = length + 1
+        self.lengths[games, STOCK] = 0
+
+    def collect(self, games: "np.ndarray", stacks: "np.ndarray") -> "np.ndarray":
+        """
+        Collect the completed set of cards on the top of a stack of each game, if any, and reveal the card
+        below the set.
+
+        Parameters:
+        - games: indices of games
+        - stacks: index of a stack of each game
+
+        Return:
+        Whether a set is collected in each game
+        """
+        length = self.lengths[games, stacks]
+        top = self.tops(games, stacks)
+        positions = length[:, None] - 13 + np.arange(13)
+        run = self.table[games[:, None], stacks[:, None], np.maximum(positions, 0)]
+        completed = (length >= 13) & (top >= 0) & (top % 13 == 0) & \
+            (run == top[:, None] + np.arange(12, -1, -1)).all(axis=1)
+        games, stacks, positions, run = games[completed], stacks[completed], positions[completed], run[completed]
+        self.table[games[:, None], stacks[:, None], positions] = -1
+        self.where[games[:, None], run] = COLLECTED
+        self.lengths[games, stacks] -= 13
+        self.win_num[games] += 1
+        self.reveal(games, stacks)
+        return completed
+
+    def step(self, policy=None) -> int:
+        """
+        Make one move in each game in progress. A game ends when it's won or there's no more moves.
+
+        Parameters:
+        - policy: function that takes the batch and the indices of games and returns the moves in the format
+                  of greedy_moves(), greedy_moves() if not given
+
+        Return:
+        Number of games still in progress
+        """
+        games = np.flatnonzero(self.active)
+        if len(games) == 0: return 0
+        src, dest, start = (policy or BatchSim.greedy_moves)(self, games)
+        self.active[games[src < 0]] = False
+        deal = src == STOCK
+        self.deal_remaining(games[deal])
+        move = (src >= 0) & ~deal
+        games, src, dest, start = games[move], src[move], dest[move], start[move]
+        self.move_cards(games, src, dest, start)
+        completed = np.ones(len(games), bool)
+        while completed.any():
+            completed = self.collect(games, dest)
+            games, dest = games[completed], dest[completed]
+        self.moves[self.active] += 1
+        self.active &= self.win_num < 4
+        return int(self.active.sum())
+
+    def run(self, max_moves: int=1000, policy=None) -> None:
+        """
+        Play all games until they end or reach the maximum number of moves.
+
+        Parameters:
+        - max_moves: maximum number of moves per game
+        - policy: the policy, see step()
+        """
+        for _ in range(max_moves):
+            if self.step(policy) == 0: break
+
+def play_greedy(seed: int, max_moves: int=1000) -> tuple[bool, int]:
+    """
+    Play a game one move at a time with CardSet.hint(), used to check the simulation.
+
+    Parameters:
+    - seed: seed of the deal
+    - max_moves: maximum number of moves
+
+    Return:
+    Whether the game is won and the number of moves made
+    """
+    from CardSet import CardSet
+    cards = CardSet()
+    cards.deal(seed)
+    moves = 0
+    while moves < max_moves and not cards.is_won():
+        move = cards.hint()
+        if move == None: break
+        cards.play(move)
+        moves += 1
+    return cards.is_won(), moves
+
+def main(argv: list[str]=None) -> None:
+    """
+    Play the greedy policy on the deals of a range of seeds in batches, and print the win rate.
+    """
+    parser = ArgumentParser(description="Simulate Scorpion Solitaire games in lockstep with NumPy.")
+    parser.add_argument("--start", type=int, default=0, help="first seed")
+    parser.add_argument("--count", type=int, default=100000, help="number of seeds")
+    parser.add_argument("--batch", type=int, default=4096, help="number of games simulated together")
+    parser.add_argument("--max-moves", type=int, default=1000, help="maximum moves per game")
+    parser.add_argument("--check", type=int, default=0, help="number of games checked against CardSet")
+    args = parser.parse_args(argv)
+    if np == None: parser.error("NumPy is not installed")
+
+    start = perf_counter()
+    wins = 0
+    moves = 0
+    for first in range(args.start, args.start + args.count, args.batch):
+        seeds = list(range(first, min(first + args.batch, args.start + args.count)))
+        sim = BatchSim(seeds)
+        sim.run(args.max_moves)
+        wins += int((sim.win_num == 4).sum())
+        moves += int(sim.moves.sum())
+        checked = seeds[:max(0, args.check - (first - args.start))]
+        for k, seed in enumerate(checked):
+            if play_greedy(seed, args.max_moves) != (bool(sim.win_num[k] == 4), int(sim.moves[k])):
+                print(f"Deal #{seed} doesn't match CardSet", file=sys.stderr)
+    seconds = perf_counter() - start
+    print(f"{args.count} deals, {wins} won ({wins / args.count:.2%}), {moves / args.count:.1f} moves per game, "
+          f"{args.count / seconds:.0f} deals/sec", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Benchmark the game engine and the canvas with fixed seeds, so results can be compared across changes.
+
+Usage: python src/Benchmark.py [--output FILE] [--compare FILE] [--repeat N] [--warmup N] [--only NAME ...]
+                               [--gui] [--xvfb]
+The canvas benchmarks run with --gui and need a display, --xvfb starts a virtual X display if there's none.
+"""
+
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from random import Random
+from statistics import mean, median, stdev
+from time import perf_counter
+from SaveGame import load_game, save_game
+from Solver import *
+
+SEED = 20240119
+""" Seed of the deals and of the moves picked in the benchmarks """
+
+BENCHMARKS: dict[str, tuple[str, object]] = {}
+""" Benchmarks with names, in format (description, setup). A setup returns a function that runs the benchmark
+once and the number of operations in a run.
+"""
+
+GUI_BENCHMARKS: dict[str, tuple[str, object]] = {}
+""" Benchmarks of the canvas with names, their setup takes the root of the canvas """
+
+def benchmark(name: str, description: str, gui: bool=False):
+    """
+    Register a benchmark.
+
+    Parameters:
+    - name: name of the benchmark
+    - description: what a single operation of the benchmark does
+    - gui: whether the benchmark needs a display
+    """
+    def register(setup):
+        (GUI_BENCHMARKS if gui else BENCHMARKS)[name] = (description, setup)
+        return setup
+    return register
+
+def fixed_seeds(num: int) -> list[int]:
+    """
+    Parameters:
+    - num: number of seeds
+
+    Return:
+    Seeds of deals that are the same in every run
+    """
+    random = DealRandom(SEED)
+    return [random.next() & 0xFFFFFFFF for _ in range(num)]
+
+def random_game(seed: int, length: int) -> tuple[CardSet, list[tuple[int, int, int]]]:
+    """
+    Play a game with moves picked from a fixed random sequence, then go back to the beginning of the game.
+
+    Parameters:
+    - seed: seed of the deal
+    - length: maximum number of moves
+
+    Return:
+    The card set at the beginning of the game and the moves played
+    """
+    cards = CardSet()
+    cards.deal(seed)
+    random = Random(seed)
+    moves = []
+    for _ in range(length):
+        legal = cards.legal_moves()
+        if len(legal) == 0: break
+        moves.append(random.choice(legal))
+        cards.play(moves[-1])
+    cards.jump_to(0)
+    return cards, moves
+
+def random_games(length: int) -> list[tuple[CardSet, list[tuple[int, int, int]]]]:
+    """
+    Play games of fixed seeds with random_game() until the given number of moves is made in total,
+    since a random game ends after a few dozen moves.
+
+    Parameters:
+    - length: total number of moves
+
+    Return:
+    The card set at the beginning of each game and the moves played, the last game is cut to the length
+    """
+    games = []
+    random = DealRandom(SEED)
+    while length > 0:
+        cards, moves = random_game(random.next() & 0xFFFFFFFF, length)
+        if len(moves) == 0: continue
+        games.append((cards, moves))
+        length -= len(moves)
+    return games
+
+
+# --------------- Engine benchmarks ---------------
+
+@benchmark("shuffle_cards", "shuffle the cards of a deal")
+def bench_shuffle():
+    cards = CardSet()
+    seeds = fixed_seeds(100)
+    def run():
+        for s in seeds: cards.shuffle_cards(s)
+    return run, len(seeds)
+
+@benchmark("reset_deal", "reset the card set and deal a new game")
+def bench_reset():
+    cards = CardSet()
+    seeds = fixed_seeds(100)
+    def run():
+        for s in seeds:
+            cards.reset(True)
+            cards.deal(s)
+    return run, len(seeds)
+
+@benchmark("switch_stack", "move a sub-stack without recording the step, replaying the steps of 200 moves")
+def bench_switch():
+    games = []
+    for cards, moves in random_games(200):  # The steps recorded by the journal, including dealing and collecting
+        for m in moves: cards.play(m)
+        steps = [s[:3] for i in range(len(moves)) for s in cards.journal.steps(i)]
+        cards.jump_to(0)
+        games.append((cards, steps))
+    def run():
+        for cards, steps in games:
+            for src, dest, length in steps: cards.switch_stack(src, dest, length, False)
+            for src, dest, length in reversed(steps): cards.switch_stack(dest, src, length, False)
+    return run, sum(2 * len(steps) for _, steps in games)
+
+@benchmark("check_stack", "check a stack that has no completed set")
+def bench_check():
+    cards, _ = random_game(SEED, 0)
+    def run():
+        for _ in range(20):
+            for i in range(7): cards.check_stack(i)
+    return run, 140
+
+@benchmark("collect_set", "make the move that completes a set, collect the set and undo")
+def bench_collect():
+    cards = CardSet()
+    for seed in range(1000):     # Find the first solvable deal and the move before its first completed set
+        cards.reset(True)
+        cards.deal(seed)
+        moves = solve(cards, 20000).moves
+        if len(moves) > 0: break
+    if len(moves) == 0: raise RuntimeError("No deal of seed 0-999 is solved within 20000 positions")
+    collect = None
+    for move in moves:
+        win_num = cards.win_num
+        cards.play(move)
+        if cards.win_num > win_num:
+            collect = move
+            break
+    if collect == None: raise RuntimeError(f"The solution of deal #{cards.seed} completes no set")
+    cards.undo()
+    def run():
+        for _ in range(50):
+            cards.play(collect)
+            cards.undo()
+    return run, 50
+
+@benchmark("hint", "restore a position and find the hint")
+def bench_hint():
+    states = []
+    for cards, moves in random_games(200):
+        for m in moves:
+            cards.play(m)
+            states.append(cards.snapshot())
+    cards = CardSet()
+    def run():
+        for s in states:
+            cards.restore(s)
+            cards.hint()
+    return run, len(states)
+
+@benchmark("undo_chain", "make a move and undo it later, 200 moves in chains of whole games")
+def bench_undo():
+    games = random_games(200)
+    def run():
+        for cards, moves in games:
+            for m in moves: cards.play(m)
+            while cards.undo(): pass
+    return run, sum(len(moves) for _, moves in games)
+
+@benchmark("deadlocked", "check all cards of a position for a deadlock")
+def bench_deadlock():
+    games = random_games(100)
+    def run():
+        for cards, moves in games:
+            for m in moves:
+                cards.play(m)
+                cards.deadlocked()
+            cards.jump_to(0)
+    return run, sum(len(moves) for _, moves in games)
+
+@benchmark("solve", "search 20000 positions of a deal")
+def bench_solve():
+    cards = CardSet()
+    seeds = fixed_seeds(3)
+    def run():
+        for s in seeds:
+            cards.reset(True)
+            cards.deal(s)
+            solve(cards, 20000)
+    return run, len(seeds)
+
+@benchmark("save_load", "save a game played until no move is left and load it")
+def bench_save():
+    cards, moves = random_games(1000)[0]
+    for m in moves: cards.play(m)
+    path = os.path.join(tempfile.gettempdir(), "scorpion-benchmark-save.bin")
+    def run():
+        save_game(path, cards)
+        load_game(path, cards)
+    return run, 1
+
+
+# --------------- Canvas benchmarks ---------------
+
+def blank_cards(root) -> dict[str, Card]:
+    """
+    Create cards with blank images, so the canvas can be measured without the image files.
+
+    Parameters:
+    - root: root component of the canvas
+
+    Return:
+    All cards with tags
+    """
+    from tkinter import PhotoImage
+    image = PhotoImage(master=root, width=CARD_WIDTH, height=CARD_HEIGHT)
+    cards = make_cards()
+    for c in cards.values(): c.image = image
+    return cards
+
+@benchmark("create_cards", "create the items of 52 cards on a new canvas", gui=True)
+def bench_create(root):
+    from GameCanvas import GameCanvas
+    cards = blank_cards(root)
+    def run():
+        canvas = GameCanvas(root)
+        canvas.create_cards(cards.values())
+        canvas.destroy()
+    return run, 1
+
+@benchmark("deal_cards", "gather the 52 cards of a canvas and place them for a new deal", gui=True)
+def bench_deal(root):
+    from GameCanvas import GameCanvas
+    cards = blank_cards(root)
+    card_set = CardSet(cards)
+    canvas = GameCanvas(root)
+    seeds = fixed_seeds(10)
+    def run():
+        for s in seeds:
+            canvas.create_cards(cards.values())
+            card_set.reset(True)
+            card_set.deal(s)
+            for stack in card_set.stacks[:7]:
+                for c in stack: canvas.start_move_card(c)
+            # Finish the animations in one frame
+            canvas.tweens = {tag: tween[:5] + (0.0,) for tag, tween in canvas.tweens.items()}
+            canvas.draw_frame()
+            if canvas.frame_id != None: canvas.after_cancel(canvas.frame_id)
+            canvas.frame_id = None
+    return run, len(seeds)
+
+@benchmark("animate_frame", "draw one frame of 52 moving cards", gui=True)
+def bench_frame(root):
+    from GameCanvas import GameCanvas
+    cards = blank_cards(root)
+    canvas = GameCanvas(root)
+    canvas.create_cards(cards.values())
+    def run():
+        for i, c in enumerate(cards.values()): canvas.move_card(c, c.x + 1 + i % 7, c.y + 1)
+        canvas.draw_frame()
+        canvas.after_cancel(canvas.frame_id)
+        canvas.frame_id = None
+        for c in cards.values(): canvas.stop_card(c)
+    return run, 1
+
+@benchmark("drag", "drag a sub-stack of 13 cards by one mouse motion", gui=True)
+def bench_drag(root):
+    from GameCanvas import GameCanvas
+    cards = blank_cards(root)
+    canvas = GameCanvas(root)
+    canvas.create_cards(cards.values())
+    dragged = list(cards.values())[:13]
+    def run():
+        canvas.start_drag(dragged, 100, 300)
+        for i in range(100): canvas.drag_to(dragged, 100 + i, 300 + i)
+        canvas.end_drag()
+    return run, 100
+
+
+# --------------- Running benchmarks ---------------
+
+def measure(run, ops: int, repeat: int, warmup: int) -> dict[str, float]:
+    """
+    Run a benchmark several times after warming up, with the garbage collector disabled while timing.
+
+    Parameters:
+    - run: function that runs the benchmark once
+    - ops: number of operations in a run
+    - repeat: number of timed runs
+    - warmup: number of runs before timing
+
+    Return:
+    Statistics of the seconds per operation
+    """
+    for _ in range(warmup): run()
+    samples = []
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = perf_counter()
+            run()
+            samples.append((perf_counter() - start) / ops)
+    finally:
+        if enabled: gc.enable()
+    return {"ops": ops, "repeat": repeat, "min": min(samples), "median": median(samples),
+            "mean": mean(samples), "stdev": stdev(samples) if repeat > 1 else 0.0}
+
+def start_virtual_display() -> subprocess.Popen:
+    """
+    Start a virtual X display with Xvfb if there's no display.
+
+    Return:
+    The Xvfb process, None if a display exists or Xvfb is not found
+    """
+    if sys.platform in ("win32", "darwin") or os.environ.get("DISPLAY") or shutil.which("Xvfb") == None:
+        return None
+    process = subprocess.Popen(["Xvfb", ":99", "-screen", "0", "1280x1024x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = ":99"
+    time.sleep(0.5)
+    return process
+
+def main(argv: list[str]=None) -> None:
+    """
+    Run the benchmarks, print the results and write them in JSON.
+    """
+    parser = ArgumentParser(description="Benchmark the Scorpion Solitaire engine and canvas.")
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--compare", help="JSON file of earlier results to compare with")
+    parser.add_argument("--repeat", type=int, default=20, help="number of timed runs per benchmark")
+    parser.add_argument("--warmup", type=int, default=3, help="number of runs before timing")
+    parser.add_argument("--only", nargs="+", help="names of the benchmarks to run")
+    parser.add_argument("--gui", action="store_true", help="also run the canvas benchmarks")
+    parser.add_argument("--xvfb", action="store_true", help="start a virtual X display for the canvas benchmarks")
+    args = parser.parse_args(argv)
+
+    benchmarks = [(name, description, setup, False) for name, (description, setup) in BENCHMARKS.items()]
+    root = None
+    display = None
+    if args.gui:
+        from tkinter import Tk, TclError
+        if args.xvfb: display = start_virtual_display()
+        try:
+            root = Tk()
+            benchmarks.extend((name, description, setup, True) for name, (description, setup) in GUI_BENCHMARKS.items())
+        except TclError:
+            print("No display, the canvas benchmarks are skipped", file=sys.stderr)
+    if args.only != None: benchmarks = [b for b in benchmarks if b[0] in args.only]
+    baseline = {}
+    if args.compare != None:
+        with open(args.compare) as f: baseline = json.load(f)["results"]
+
+    results = {}
+    try:
+        for name, description, setup, gui in benchmarks:
+            run, ops = setup(root) if gui else setup()
+            results[name] = measure(run, ops, args.repeat, args.warmup)
+            results[name]["description"] = description
+            line = f"{name:<16}{results[name]['median'] * 1e6:>12.2f} us/op  " \
+                   f"(min {results[name]['min'] * 1e6:.2f}, stdev {results[name]['stdev'] * 1e6:.2f})"
+            if name in baseline: line += f"  {results[name]['median'] / baseline[name]['median']:.2f}x of baseline"
+            print(line, file=sys.stderr)
+    finally:
+        if root != None: root.destroy()
+        if display != None: display.terminate()
+    if args.output != None:
+        report = {"python": platform.python_version(), "platform": platform.platform(),
+                  "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": SEED, "results": results}
+        with open(args.output, "w") as f: json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
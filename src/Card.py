@@ -1,5 +1,3 @@
-from PIL import Image, ImageTk
-
 CARD_WIDTH = 110
 """ Width of playing cards """
 
@@ -18,9 +16,12 @@ V_GAP = 20
 H_GAP = 30
 """ Initial horizontal gap between the top of each cards """
 
+TYPES = ["club", "diamond", "heart", "spade"]
+""" Types of the cards, in the order used to number the cards """
+
 class Card:
     """
-    Represent a playing card
+    Represent a playing card. The card only holds the state of the game, images are assigned by the UI.
     """
     
     def __init__(self, type: str, value: int) -> None:
@@ -37,11 +38,12 @@ class Card:
         """ Value of the card """
         self.tag = type + str(value)
         """ Tag of the card used to get the card from the canvas """
-        self.image = ImageTk.PhotoImage(Image.open(f"src/img/{type}{str(value)}.png")
-                                        .resize((CARD_WIDTH, CARD_HEIGHT), resample=Image.LANCZOS))
-        """ Image of the card """
+        self.id = TYPES.index(type) * 13 + value - 1
+        """ Number of the card from 0 to 51, cards of the same type are numbered by value """
+        self.image = None
+        """ Image of the card, assigned by the UI """
         self.hidden = False
-        """ Whether the card is hidden (including the completed set of cards) """
+        """ Whether the card is hidden (faced down) """
         self.x = CARD_X
         """ X-coordinate of the card """
         self.y = CARD_Y
@@ -50,5 +52,12 @@ class Card:
         """ Number of stack the card belongs to """
         self.card_idx = value - 1
         """ Number of card in a stack (from top to bottom) """
-        self.move_id = None
-        """ Id return by canvas.move() if the card is moving """
\ No newline at end of file
+
+def make_cards() -> dict[str, Card]:
+    """
+    Create all 52 playing cards without images.
+    
+    Return:
+    All cards with tags, ordered by their id
+    """
+    return {t + str(v): Card(t, v) for t in TYPES for v in range(1, 14)}
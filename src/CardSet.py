@@ -1,32 +1,61 @@
 from Card import *
-from random import randint
+from CardState import *
+from DealGenerator import *
+from Journal import *
+
+DEAL_MOVE = (7, 0, 3)
+""" The move that deals the remaining cards to the first three stacks, in format (src, dest, length) """
 
 class CardSet:
     """
     Represent a set of cards used in the game
     """
     
-    def __init__(self, cards: dict[str, Card]) -> None:
+    def __init__(self, cards: dict[str, Card]=None) -> None:
         """
         Create a set of cards.
         
         Parameters:
-        - cards: predefined cards with images
+        - cards: predefined cards, create new cards without images if not given
         """
-        self.cards = cards
+        self.cards = cards if cards != None else make_cards()
         """ All cards with tags """
+        self.by_id: list[Card] = sorted(self.cards.values(), key=lambda c: c.id)
+        """ All cards indexed by their id """
         self.stacks: list[list[Card]] = []
         """ Card stacks used to organize cards during the game
         Stack 0-6: dealed cards
         Stack 7: remaining cards after dealing
         Stack 8-11: completed set of cards
         """
-        self.old_stacks: list[list[Card]] = []
-        """ A copy of the stacks at the beginning of the game """
+        self.start: CardState = None
+        """ The state of the card set at the beginning of the game """
         self.win_num: int = 0
         """ Number of completed set of cards """
-        self.steps: list[tuple[int, int, int, bool]] = []
-        """ List of steps taken by the user in format (src, dest, length), used for undo """
+        self.journal: Journal = Journal()
+        """ Moves made by the user, used for undo and redo """
+        self.zobrist: int = 0
+        """ Zobrist hash of the stacks and hidden cards, updated after each step """
+        self.seed: int = None
+        """ Seed of the current deal """
+        self.changed: int = 0
+        """ Bit mask of stacks changed since the available moves are updated """
+        self.empty_stacks: int = 0
+        """ Bit mask of empty stacks among stack 0-6, call update_moves() before use """
+        self.moves_onto: list[tuple[int, int, int]] = [None] * 7
+        """ The available move onto the last card of each of stack 0-6 in format (src, dest, length), None if
+        there's no move. Call update_moves() before use.
+        """
+        self.sources: list[int] = [-1] * 7
+        """ The stack of the card that can be moved onto the last card of each of stack 0-6, -1 if no card """
+        self.dependents: list[int] = [0] * 12
+        """ Bit mask of stacks whose move in moves_onto comes from each stack """
+        self.move_num: int = 0
+        """ Number of available moves in moves_onto """
+        self.runs: list[int] = [1] * 52
+        """ Number of cards in the descending sequence of same type that ends at each card, indexed by card id """
+        self.sequenced: int = 0
+        """ Number of cards placed on the card of same type with value one greater """
         
     def switch_stack(self, src: int, dest: int, length: int, add_step: bool=True) -> None:
         """
@@ -36,62 +65,96 @@ class CardSet:
         - src: the source stack
         - dest: the destination stack
         - length: the length of sub-stack
+        - add_step: whether to add the step to the current move in the journal
         """
         c_idx = len(self.stacks[dest])
         temp = self.stacks[src][len(self.stacks[src]) - length:]
+        parent = self.stacks[dest][-1] if c_idx > 0 else None
+        if length > 0:
+            below = self.stacks[src][-length - 1].id if len(self.stacks[src]) > length else ZOBRIST_BASE + src
+            above = parent.id if parent != None else ZOBRIST_BASE + dest
+            self.zobrist ^= ZOBRIST_PARENT[temp[0].id * 64 + below] ^ ZOBRIST_PARENT[temp[0].id * 64 + above]
+            if self.runs[temp[0].id] > 1: self.sequenced -= 1
         self.stacks[dest].extend(temp)
-        for i in range(length):
-            self.stacks[src].pop()
-            temp[i].stack_idx = dest
-            temp[i].card_idx = c_idx
+        del self.stacks[src][len(self.stacks[src]) - length:]
+        for c in temp:
+            c.stack_idx = dest
+            c.card_idx = c_idx
             c_idx += 1
-        is_hidden = self.stacks[src][-1].hidden if len(self.stacks[src]) > 0 else False
-        if add_step: self.steps.append((src, dest, length, is_hidden))
+        if length > 0:
+            # Update the sequences that pass through the first moved card
+            runs = self.runs
+            run = runs[parent.id] + 1 if parent != None and parent.id == temp[0].id + 1 and temp[0].value != 13 else 1
+            if run > 1: self.sequenced += 1
+            for i in range(length):
+                c = temp[i]
+                if i > 0 and (c.id + 1 != temp[i - 1].id or c.value == 13 or runs[c.id] == run): break
+                runs[c.id] = run
+                run += 1
+        if add_step: self.journal.add(src, dest, length, len(self.stacks[src]) > 0 and self.stacks[src][-1].hidden)
+        self.changed |= 1 << src | 1 << dest
+    
+    def set_hidden(self, card: Card, hidden: bool) -> None:
+        """
+        Hide or reveal a card and update the Zobrist hash.
+        
+        Parameters:
+        - card: the card to hide or reveal
+        - hidden: whether the card is hidden
+        """
+        if card.hidden != hidden:
+            card.hidden = hidden
+            self.zobrist ^= ZOBRIST_HIDDEN[card.id]
+            self.changed |= 1 << card.stack_idx
+    
+    def update_moves(self) -> None:
+        """
+        Update the empty stacks and the available moves for the stacks changed since the last update.
+        Only the moves onto a changed stack or from a changed stack are found again.
+        """
+        if self.changed == 0: return
+        stacks = self.stacks
+        sources = self.sources
+        dependents = self.dependents
+        moves_onto = self.moves_onto
+        changed = self.changed
+        self.changed = 0
+        todo = changed & 0x7F
+        while changed != 0:
+            i = (changed & -changed).bit_length() - 1
+            changed &= changed - 1
+            if i < 7:
+                if len(stacks[i]) == 0: self.empty_stacks |= 1 << i
+                else: self.empty_stacks &= ~(1 << i)
+            todo |= dependents[i]
+        while todo != 0:
+            i = (todo & -todo).bit_length() - 1
+            todo &= todo - 1
+            move = None
+            src = -1
+            stack = stacks[i]
+            if len(stack) > 0 and stack[-1].value != 1:
+                card = self.by_id[stack[-1].id - 1]
+                src = card.stack_idx
+                if not card.hidden and src < 7 and src != i:
+                    move = (src, i, len(stacks[src]) - card.card_idx)
+            if src != sources[i]:
+                if sources[i] >= 0: dependents[sources[i]] &= ~(1 << i)
+                if src >= 0: dependents[src] |= 1 << i
+                sources[i] = src
+            if move != moves_onto[i]:
+                self.move_num += (move != None) - (moves_onto[i] != None)
+                moves_onto[i] = move
 
-    def shuffle_cards(self) -> None:
+    def shuffle_cards(self, seed: int=None) -> None:
         """
-        Shuffle cards into 7 stacks of cards while make sure there's at least one way to win the game.
+        Shuffle cards into 7 stacks of 7 cards and 3 remaining cards, and hide the cards that are faced down.
+        
+        Parameters:
+        - seed: seed of the shuffle, the same seed always gives the same deal. Use a random seed if not given.
         """ 
-        # Assign 4 types of cards into 4 stacks by types
-        for i in range(4):
-            s = list(self.cards.values())[i * 13 : (i + 1) * 13]
-            for c in s: c.stack_idx = i
-            self.stacks.append(s)
-        self.stacks.extend([[], [], [], [], [], [], [], []])
-        
-        # Shuffle cards into 7 stacks by removing some cards from the end of a stack add them to another stack,
-        # but leave at least one card on each stack
-        for _ in range(2):
-            for i in range(6):
-                for j in range(i + 1, 7):
-                    # Move some cards from first stack to second stack
-                    max = len(self.stacks[i]) - 1 if len(self.stacks[i]) > 0 else 0
-                    self.switch_stack(i, j, randint(0, max), False)
-                    # Move some cards from second stack to first stack
-                    max = len(self.stacks[j]) - 1 if len(self.stacks[j]) > 0 else 0
-                    self.switch_stack(j, i, randint(0, max), False)
-        
-        # Deal three cards to the 8th stack
-        for i in range(3):
-            self.switch_stack(i, 7, 1, False)
-            
-        # Shuffle again
-        for _ in range(4):
-            for i in range(6):
-                for j in range(i + 1, 7):
-                    # Move some cards from first stack to second stack
-                    self.switch_stack(i, j, randint(0, len(self.stacks[i])), False)
-                    # Move some cards from second stack to first stack
-                    self.switch_stack(j, i, randint(0, len(self.stacks[j])), False)
-        
-        # Make sure each stack have 7 cards at the end.
-        for i in range(7):
-            if len(self.stacks[i]) > 7:
-                self.switch_stack(i, i + 1, len(self.stacks[i]) - 7, False)
-            elif len(self.stacks[i]) < 7:
-                j = i + 1
-                while len(self.stacks[j]) < 7 - len(self.stacks[i]): j += 1
-                self.switch_stack(j, i, 7 - len(self.stacks[i]), False)
+        self.seed = seed if seed != None else random_seed()
+        self.restore(generate_deal(self.seed))
     
     def check_stack(self, stack_idx: int) -> bool:
         """
@@ -104,23 +167,82 @@ class CardSet:
         Return:
         Whether there's a completed set
         """
-        completed = len(self.stacks[stack_idx]) > 12
+        completed = self.top_run(stack_idx) == 13
+        # Collect set and reveal the card below it
         if completed:
-            # Check for completeness
-            s = self.stacks[stack_idx][len(self.stacks[stack_idx]) - 13:]
-            t = s[0].type
-            v = 13
-            for c in s:
-                if c.type != t or c.value != v:
-                    completed = False
-                    break
-                v -= 1
-            # Collect set
-            if completed:
-                self.win_num += 1
-                self.switch_stack(stack_idx, self.win_num + 7, 13)
+            self.win_num += 1
+            self.switch_stack(stack_idx, self.win_num + 7, 13)
+            if len(self.stacks[stack_idx]) > 0: self.set_hidden(self.stacks[stack_idx][-1], False)
         return completed
     
+    def top_run(self, stack_idx: int) -> int:
+        """
+        Parameters:
+        - stack_idx: index of the stack
+        
+        Return:
+        Number of cards in the descending sequence of same type at the end of the stack, 0 if the stack is empty
+        """
+        return self.runs[self.stacks[stack_idx][-1].id] if len(self.stacks[stack_idx]) > 0 else 0
+    
+    def longest_run(self) -> int:
+        """
+        Return:
+        Number of cards in the longest descending sequence of same type at the end of stack 0-6
+        """
+        return max(self.top_run(i) for i in range(7))
+    
+    def blockers(self, card: Card) -> list[Card]:
+        """
+        Find the cards that must move before a card can move onto the card one greater of its type:
+        the card on top of the greater card, and the greater card itself if it's right on the card.
+        Neither of them is on the card one greater of its type, so they must move to win the game.
+        
+        Parameters:
+        - card: a card in stack 0-6
+        
+        Return:
+        The cards that must move first, empty if there's none, the card is on the card one greater
+        or the card is 'King'(value 13)
+        """
+        if card.value == 13: return []
+        target = self.by_id[card.id + 1]
+        if target.stack_idx > 6 or (target.stack_idx == card.stack_idx and target.card_idx + 1 == card.card_idx):
+            return []
+        stack = self.stacks[target.stack_idx]
+        blockers = [stack[target.card_idx + 1]] if target.card_idx + 1 < len(stack) else []
+        if target.stack_idx == card.stack_idx and target.card_idx == card.card_idx + 1: blockers.append(target)
+        return blockers
+    
+    def deadlocked(self, cards: list[Card]=None) -> bool:
+        """
+        Check whether the game can't be won without searching, because some cards must move before each other.
+        Every card in such a cycle must move to win, but none of them can move first.
+        
+        Parameters:
+        - cards: the cards to start the check from, such as the cards covered by the last move.
+                 All cards in stack 0-6 if not given.
+        
+        Return:
+        Whether a deadlock is found
+        """
+        if cards == None: cards = [c for s in self.stacks[:7] for c in s]
+        state = [0] * 52    # 0 not visited, 1 being visited, 2 visited without finding a cycle
+        for start in cards:
+            if state[start.id] != 0: continue
+            state[start.id] = 1
+            todo = [(start, iter(self.blockers(start)))]
+            while len(todo) > 0:
+                card = next(todo[-1][1], None)
+                if card == None:
+                    state[todo.pop()[0].id] = 2
+                elif state[card.id] == 1:
+                    return True
+                elif state[card.id] == 0:
+                    state[card.id] = 1
+                    todo.append((card, iter(self.blockers(card))))
+        return False
+    
     def reset(self, new: bool) -> None:
         """
         Reset the card set to the beginning of the game.
@@ -129,24 +251,324 @@ class CardSet:
         - new: whether the user is starting a new game.
         """
         self.stacks.clear()
-        self.steps.clear()
+        if new: self.journal.clear()
+        else: self.journal.done = 0
         self.win_num = 0
+        self.zobrist = 0
+        self.changed = 0
+        self.empty_stacks = 0
+        self.moves_onto = [None] * 7
+        self.sources = [-1] * 7
+        self.dependents = [0] * 12
+        self.move_num = 0
+        self.runs = [1] * 52
+        self.sequenced = 0
         for c in self.cards.values():
-            c.x = CARD_X
-            c.y = CARD_Y
             c.hidden = False
-        if new:     # Starting a new game
-            self.old_stacks.clear()
-            for c in self.cards.values():
-                c.stack_idx = -1
-                c.stack_idx = c.value - 1
-        else:       # Restarting the current game
-            for i in range(7):
-                for j in range(len(self.old_stacks[i])):
-                    c = self.old_stacks[i][j]
-                    c.stack_idx = i
-                    c.card_idx = j
-            for i in range(3):
-                c = self.old_stacks[7][i]
-                c.stack_idx = 7
-                c.card_idx = i
\ No newline at end of file
+            c.stack_idx = -1
+            c.card_idx = c.value - 1
+        if new:
+            self.start = None
+            self.seed = None
+    
+    def snapshot(self) -> CardState:
+        """
+        Return:
+        The compact state of the stacks and hidden cards
+        """
+        hidden = 0
+        for c in self.by_id:
+            if c.hidden: hidden |= 1 << c.id
+        return CardState.from_stacks([[c.id for c in s] for s in self.stacks], hidden)
+    
+    def restore(self, state: CardState) -> None:
+        """
+        Restore the stacks and hidden cards from a compact state. Steps are not changed.
+        
+        Parameters:
+        - state: the state to restore
+        """
+        hidden = state.hidden
+        self.stacks = []
+        self.sequenced = 0
+        for i, ids in enumerate(state.stacks()):
+            s = [self.by_id[x] for x in ids]
+            for j in range(len(s)):
+                c = s[j]
+                c.stack_idx = i
+                c.card_idx = j
+                c.hidden = hidden >> c.id & 1 == 1
+                if j > 0 and s[j - 1].id == c.id + 1 and c.value != 13:
+                    self.runs[c.id] = self.runs[s[j - 1].id] + 1
+                    self.sequenced += 1
+                else:
+                    self.runs[c.id] = 1
+            self.stacks.append(s)
+        self.win_num = state.win_num
+        self.zobrist = state.zobrist()
+        self.changed = (1 << len(self.stacks)) - 1
+    
+    def deal(self, seed: int=None, state: CardState=None) -> None:
+        """
+        Deal cards into stacks and hide the cards that are faced down.
+        If the start state is saved, means it's restarting the game. In this case, restore the start state.
+        Else, use the given state or shuffle cards.
+        
+        Parameters:
+        - seed: seed of the shuffle, use a random seed if not given
+        - state: a state after dealing, such as a deal from a deal library, whose seed is the given seed
+        """
+        if self.start != None:
+            self.restore(self.start)
+        elif state != None:
+            self.seed = seed
+            self.restore(state)
+            self.start = state
+        else:
+            self.shuffle_cards(seed)
+            self.start = self.snapshot()
+        self.journal.checkpoints[:1] = [self.start]
+    
+    def first_empty(self) -> int:
+        """
+        Return:
+        The index of first empty stack from left to right, -1 if there's no empty stack
+        """
+        self.update_moves()
+        return (self.empty_stacks & -self.empty_stacks).bit_length() - 1
+    
+    def can_move(self, card: Card, dest: int) -> bool:
+        """
+        Check whether the card and cards below it can be moved to the destination stack.
+        
+        Parameters:
+        - card: the card to move
+        - dest: the destination stack
+        
+        Return:
+        Whether the move is valid
+        """
+        if card.hidden or card.stack_idx > 6 or dest < 0 or dest > 6 or dest == card.stack_idx: return False
+        if len(self.stacks[dest]) == 0: return card.value == 13
+        target = self.stacks[dest][-1]
+        return target.type == card.type and target.value == card.value + 1
+    
+    def find_dest(self, card: Card) -> int:
+        """
+        Find the stack the card can be moved to.
+        There're two possible valid moves:
+        1. The last card in a stack (except for the stack of the card) has same type as the card
+           and has value exactly one greater than the card.
+        2. The card has value 13 and there's at least one empty stack. In this case,
+           move to the leftmost empty stack.
+        
+        Parameters:
+        - card: the card to move
+        
+        Return:
+        The index of the destination stack, -1 if the card is not movable
+        """
+        if card.hidden or card.stack_idx > 6: return -1
+        if card.value == 13: return self.first_empty()
+        target = self.by_id[card.id + 1]
+        if not target.hidden and target.stack_idx != card.stack_idx and target.stack_idx < 7 \
+                and target.card_idx == len(self.stacks[target.stack_idx]) - 1:
+            return target.stack_idx
+        return -1
+    
+    def move_cards(self, card: Card, dest: int) -> Card:
+        """
+        Move the card and cards below it to the destination stack, and reveal the card left on the top
+        of the source stack. The move is not checked, use find_dest() or can_move() before moving.
+        
+        Parameters:
+        - card: the card to move
+        - dest: the destination stack
+        
+        Return:
+        The card revealed after the move, None if no card is revealed
+        """
+        src = card.stack_idx
+        self.begin_move()
+        self.switch_stack(src, dest, len(self.stacks[src]) - card.card_idx)
+        reveal = self.stacks[src][-1] if len(self.stacks[src]) > 0 else None
+        if reveal != None and reveal.hidden:
+            self.set_hidden(reveal, False)
+            return reveal
+        return None
+    
+    def deal_remaining(self) -> list[Card]:
+        """
+        Deal the remaining cards to the first three stacks, one card per stack.
+        
+        Return:
+        The cards dealt, empty if the remaining cards have been dealt
+        """
+        dealt = []
+        if len(self.stacks[7]) == 3:
+            self.begin_move()
+            for i in reversed(range(3)):
+                c = self.stacks[7][i]
+                self.set_hidden(c, False)
+                self.switch_stack(7, i, 1)
+                dealt.append(c)
+        return dealt
+    
+    def begin_move(self) -> None:
+        """
+        Start a new move in the journal, the moves undone can no longer be redone.
+        A snapshot is kept every CHECKPOINT_INTERVAL moves.
+        """
+        journal = self.journal
+        if journal.done % CHECKPOINT_INTERVAL == 0 and len(journal.checkpoints) * CHECKPOINT_INTERVAL == journal.done:
+            journal.checkpoints.append(self.snapshot())
+        journal.begin()
+    
+    def undo_step(self, step: tuple[int, int, int, bool]) -> None:
+        """
+        Undo a step, the journal is not changed.
+        
+        Parameters:
+        - step: the step in format (src, dest, length, hidden)
+        """
+        src, dest, length, hidden = step
+        if src == 7:    # Hide the dealt card and return it to the remaining cards
+            self.set_hidden(self.stacks[dest][-1], True)
+        else:
+            if hidden: self.set_hidden(self.stacks[src][-1], True)
+            if dest > 7: self.win_num -= 1
+        self.switch_stack(dest, src, length, False)
+    
+    def redo_step(self, step: tuple[int, int, int, bool]) -> None:
+        """
+        Make a step again, the journal is not changed.
+        
+        Parameters:
+        - step: the step in format (src, dest, length, hidden)
+        """
+        src, dest, length, hidden = step
+        if src == 7:    # Reveal the dealt card
+            self.set_hidden(self.stacks[7][-1], False)
+        elif dest > 7:
+            self.win_num += 1
+        self.switch_stack(src, dest, length, False)
+        if src != 7 and hidden: self.set_hidden(self.stacks[src][-1], False)
+    
+    def undo(self) -> list[tuple[int, int, int, bool]]:
+        """
+        Undo the previous move, including collecting a completed set after the move.
+        
+        Return:
+        The steps undone in format (src, dest, length, hidden), in the order they are undone,
+        empty if there's no move to undo
+        """
+        journal = self.journal
+        if journal.done == 0: return []
+        journal.done -= 1
+        undone = [decode_step(e) for e in reversed(journal.entries[journal.marks[journal.done]:
+                                                                   journal.marks[journal.done + 1]])]
+        for step in undone: self.undo_step(step)
+        return undone
+    
+    def redo(self) -> list[tuple[int, int, int, bool]]:
+        """
+        Make the last move undone again.
+        
+        Return:
+        The steps made in format (src, dest, length, hidden), in the order they are made,
+        empty if there's no move to redo
+        """
+        journal = self.journal
+        if journal.done == len(journal): return []
+        steps = journal.steps(journal.done)
+        for step in steps: self.redo_step(step)
+        journal.done += 1
+        return steps
+    
+    def jump_to(self, move_idx: int) -> None:
+        """
+        Go to the position after a number of moves recorded in the journal, by undoing or redoing moves,
+        or by restoring the closest snapshot and redoing the moves after it, whichever takes fewer steps.
+        
+        Parameters:
+        - move_idx: number of moves made at the position, from 0 to the number of moves recorded
+        """
+        journal = self.journal
+        if move_idx < 0 or move_idx > len(journal): raise IndexError(f"No move {move_idx} in the journal")
+        marks = journal.marks
+        n = journal.checkpoint(move_idx)
+        if n >= 0 and RESTORE_COST + marks[move_idx] - marks[n] < abs(marks[move_idx] - marks[journal.done]):
+            self.restore(journal.checkpoints[n // CHECKPOINT_INTERVAL])
+            journal.done = n
+        while journal.done > move_idx: self.undo()
+        while journal.done < move_idx: self.redo()
+    
+    def king_moves(self) -> list[tuple[int, int, int]]:
+        """
+        Return:
+        List of moves of 'King'(value 13) to the leftmost empty stack in format (src, dest, length)
+        """
+        moves = []
+        dest = self.first_empty()
+        if dest >= 0:
+            for t in range(4):
+                card = self.by_id[t * 13 + 12]
+                if not card.hidden and card.stack_idx < 7 and card.card_idx != 0:
+                    moves.append((card.stack_idx, dest, len(self.stacks[card.stack_idx]) - card.card_idx))
+        return moves
+    
+    def legal_moves(self) -> list[tuple[int, int, int]]:
+        """
+        Find all available moves, in the order of preference used for hints:
+        'King'(value 13) to an empty stack, moves to the stacks from left to right, and dealing
+        the remaining cards.
+        
+        Return:
+        List of moves in format (src, dest, length)
+        """
+        moves = self.king_moves()
+        self.update_moves()
+        if self.move_num > 0: moves.extend(m for m in self.moves_onto if m != None)
+        if len(self.stacks[7]) > 0: moves.append(DEAL_MOVE)
+        return moves
+    
+    def has_moves(self) -> bool:
+        """
+        Return:
+        Whether there's any available move
+        """
+        self.update_moves()
+        return self.move_num > 0 or len(self.stacks[7]) > 0 or len(self.king_moves()) > 0
+    
+    def hint(self) -> tuple[int, int, int]:
+        """
+        Return:
+        The preferred available move in format (src, dest, length), None if there's no more moves
+        """
+        moves = self.king_moves()
+        if len(moves) > 0: return moves[0]
+        self.update_moves()
+        if self.move_num > 0:
+            for m in self.moves_onto:
+                if m != None: return m
+        return DEAL_MOVE if len(self.stacks[7]) > 0 else None
+    
+    def play(self, move: tuple[int, int, int]) -> None:
+        """
+        Make a move and collect the completed set of cards, if any.
+        
+        Parameters:
+        - move: the move in format (src, dest, length)
+        """
+        if move[0] == 7:
+            self.deal_remaining()
+        else:
+            self.move_cards(self.stacks[move[0]][-move[2]], move[1])
+            while self.check_stack(move[1]): pass
+    
+    def is_won(self) -> bool:
+        """
+        Return:
+        Whether all four sets of cards are completed
+        """
+        return self.win_num == 4
\ No newline at end of file
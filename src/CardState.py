@@ -0,0 +1,122 @@
+from hashlib import blake2b
+from random import Random
+
+STACK_NUM = 12
+""" Number of stacks in a card set """
+
+CARD_NUM = 52
+""" Number of cards in a card set """
+
+ZOBRIST_BASE = CARD_NUM
+""" Index used in Zobrist keys for the bottom of the first stack, the other stacks follow it """
+
+_zobrist_random = Random(52)
+ZOBRIST_PARENT: list[int] = [_zobrist_random.getrandbits(64) for _ in range(CARD_NUM * (CARD_NUM + STACK_NUM))]
+""" Zobrist keys of a card placed on another card or on the bottom of a stack,
+index by card id * 64 + id of the card below it (or ZOBRIST_BASE + stack index)
+"""
+ZOBRIST_HIDDEN: list[int] = [_zobrist_random.getrandbits(64) for _ in range(CARD_NUM)]
+""" Zobrist keys of hidden cards, indexed by card id """
+
+class CardState:
+    """
+    Represent a compact and immutable state of a card set.
+    The state is stored in bytes, so it can be copied, hashed and compared without walking the cards.
+    """
+    
+    __slots__ = ("data", "_hash")
+    
+    SIZE = CARD_NUM + STACK_NUM + 7
+    """ Number of bytes used by a state """
+    
+    def __init__(self, data: bytes) -> None:
+        """
+        Create a state from its bytes.
+        
+        Parameters:
+        - data: 52 card ids ordered by stack then by position in the stack, followed by the length of
+                each of the 12 stacks and a 7-byte little-endian bit mask of hidden cards indexed by card id
+        """
+        if len(data) != CardState.SIZE: raise ValueError(f"A card state must have {CardState.SIZE} bytes")
+        self.data = bytes(data)
+        """ Bytes of the state """
+        self._hash = None
+        """ Cached hash of the state """
+    
+    @staticmethod
+    def from_stacks(stacks: list[list[int]], hidden: int) -> "CardState":
+        """
+        Create a state from stacks of card ids.
+        
+        Parameters:
+        - stacks: 12 stacks of card ids
+        - hidden: bit mask of hidden cards, bit n is set if the card with id n is hidden
+        
+        Return:
+        The state
+        """
+        data = bytearray()
+        for s in stacks: data.extend(s)
+        data.extend(len(s) for s in stacks)
+        data.extend(hidden.to_bytes(7, "little"))
+        return CardState(data)
+    
+    def stacks(self) -> list[list[int]]:
+        """
+        Return:
+        12 stacks of card ids
+        """
+        stacks = []
+        pos = 0
+        for n in self.data[CARD_NUM : CARD_NUM + STACK_NUM]:
+            stacks.append(list(self.data[pos : pos + n]))
+            pos += n
+        return stacks
+    
+    @property
+    def lengths(self) -> bytes:
+        """ Number of cards in each stack """
+        return self.data[CARD_NUM : CARD_NUM + STACK_NUM]
+    
+    @property
+    def hidden(self) -> int:
+        """ Bit mask of hidden cards, bit n is set if the card with id n is hidden """
+        return int.from_bytes(self.data[CARD_NUM + STACK_NUM:], "little")
+    
+    @property
+    def win_num(self) -> int:
+        """ Number of completed set of cards """
+        return sum(1 for n in self.data[CARD_NUM + 8 : CARD_NUM + STACK_NUM] if n > 0)
+    
+    def zobrist(self) -> int:
+        """
+        Compute the Zobrist hash of the state. A position is identified by the card (or the stack bottom) below
+        each card, so moving a sub-stack only changes the key of its first card.
+        
+        Return:
+        The 64-bit Zobrist hash
+        """
+        key = 0
+        pos = 0
+        for i, n in enumerate(self.lengths):
+            below = ZOBRIST_BASE + i
+            for c in self.data[pos : pos + n]:
+                key ^= ZOBRIST_PARENT[c * 64 + below]
+                below = c
+            pos += n
+        hidden = self.hidden
+        for c in range(CARD_NUM):
+            if hidden >> c & 1: key ^= ZOBRIST_HIDDEN[c]
+        return key
+    
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CardState) and self.data == other.data
+    
+    def __hash__(self) -> int:
+        # Use a digest instead of the built-in hash of bytes so the hash is the same in every process
+        if self._hash == None:
+            self._hash = int.from_bytes(blake2b(self.data, digest_size=8).digest(), "little", signed=True)
+        return self._hash
+    
+    def __repr__(self) -> str:
+        return f"CardState({self.data.hex()})"
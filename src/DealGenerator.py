@@ -0,0 +1,72 @@
+from CardState import *
+from random import randrange
+
+MASK = (1 << 64) - 1
+""" Mask of 64-bit integers """
+
+SEED_NUM = 1 << 32
+""" Number of seeds given by random_seed() """
+
+HIDDEN_POS = [0, 1, 2, 7, 8, 9, 14, 15, 16, 21, 22, 23, 49, 50, 51]
+""" Positions of the faced down cards in a deal: the first three cards of stack 0-3 and the remaining cards """
+
+DEAL_LENGTHS = bytes([7, 7, 7, 7, 7, 7, 7, 3, 0, 0, 0, 0])
+""" Number of cards in each stack after dealing """
+
+class DealRandom:
+    """
+    Represent a random number generator used to shuffle the cards (SplitMix64).
+    It doesn't depend on the random module, so a seed gives the same numbers in every version of Python
+    and of the game.
+    """
+    
+    def __init__(self, seed: int) -> None:
+        """
+        Create a random number generator.
+        
+        Parameters:
+        - seed: the seed, only the lowest 64 bits are used
+        """
+        self.state = seed & MASK
+        """ State of the generator """
+    
+    def next(self) -> int:
+        """
+        Return:
+        The next random 64-bit integer
+        """
+        self.state = (self.state + 0x9E3779B97F4A7C15) & MASK
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+        return z ^ (z >> 31)
+
+def random_seed() -> int:
+    """
+    Return:
+    A random seed for a new deal
+    """
+    return randrange(SEED_NUM)
+
+def generate_deal(seed: int) -> CardState:
+    """
+    Deal the cards of a seed. The cards are shuffled by Fisher-Yates shuffle whose swaps are taken from
+    a 256-bit random number, one digit per swap in a mixed radix, which is enough for all 52! orders.
+    The shuffled cards are dealt to 7 stacks of 7 cards and 3 remaining cards.
+    The same seed always gives the same deal, this must not change once deals are shared.
+    
+    Parameters:
+    - seed: the seed of the deal
+    
+    Return:
+    The state after dealing, with the faced down cards hidden
+    """
+    r = DealRandom(seed)
+    x = r.next() | r.next() << 64 | r.next() << 128 | r.next() << 192
+    ids = list(range(CARD_NUM))
+    for i in range(CARD_NUM - 1, 0, -1):
+        x, j = divmod(x, i + 1)
+        ids[i], ids[j] = ids[j], ids[i]
+    hidden = 0
+    for p in HIDDEN_POS: hidden |= 1 << ids[p]
+    return CardState(bytes(ids) + DEAL_LENGTHS + hidden.to_bytes(7, "little"))
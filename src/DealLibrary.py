@@ -0,0 +1,174 @@
+"""
+Build and read libraries of validated deals.
+
+Usage: python src/DealLibrary.py OUTPUT RESULTS [RESULTS ...]
+where RESULTS are output files of ValidateDeals.py.
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from mmap import mmap, ACCESS_READ
+from random import randrange
+from struct import Struct, error as struct_error
+from DealGenerator import *
+from ValidateDeals import read_results
+
+HEADER = Struct("<4sHHII")
+""" Format of the header: magic, version, size of a record, number of records, number of solvable records """
+
+RECORD = Struct("<52sQIHb")
+""" Format of a deal: card ids in dealing order, seed, difficulty score, solution length, solvable
+(1 yes, 0 no, -1 unknown)
+"""
+
+MAGIC = b"SCDL"
+""" Magic bytes at the start of a deal library """
+
+VERSION = 1
+""" Version of the deal library format """
+
+DIFFICULTY_OFFSET = 60
+""" Offset of the difficulty score in a record """
+
+class DealLibrary:
+    """
+    Represent a memory-mapped library of deals.
+    Solvable deals are stored first, sorted by difficulty score, so a deal can be picked by index or by
+    difficulty without reading the whole file.
+    """
+    
+    def __init__(self, path: str) -> None:
+        """
+        Open a deal library.
+        
+        Parameters:
+        - path: path of the library file
+        """
+        with open(path, "rb") as f: self.data = mmap(f.fileno(), 0, access=ACCESS_READ)
+        """ Memory-mapped content of the file """
+        try:
+            magic, version, size, count, solvable_num = HEADER.unpack_from(self.data)
+            if magic != MAGIC or version != VERSION or size != RECORD.size:
+                raise ValueError(f"{path} is not a deal library of version {VERSION}")
+            if len(self.data) < HEADER.size + count * RECORD.size:
+                raise ValueError(f"{path} is truncated")
+        except (ValueError, struct_error):
+            self.data.close()
+            raise
+        self.count: int = count
+        """ Number of deals """
+        self.solvable_num: int = solvable_num
+        """ Number of solvable deals, stored before other deals """
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def record(self, index: int) -> tuple[int, CardState, bool, int, int]:
+        """
+        Read a deal.
+        
+        Parameters:
+        - index: index of the deal
+        
+        Return:
+        The deal in format (seed, state, solvable, difficulty score, solution length)
+        """
+        if index < 0 or index >= self.count: raise IndexError("deal index out of range")
+        ids, seed, difficulty, length, solvable = RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+        hidden = 0
+        for p in HIDDEN_POS: hidden |= 1 << ids[p]
+        state = CardState(ids + DEAL_LENGTHS + hidden.to_bytes(7, "little"))
+        return seed, state, solvable == 1, difficulty, length
+    
+    def difficulty(self, index: int) -> int:
+        """
+        Parameters:
+        - index: index of the deal
+        
+        Return:
+        The difficulty score of the deal
+        """
+        pos = HEADER.size + index * RECORD.size + DIFFICULTY_OFFSET
+        return int.from_bytes(self.data[pos : pos + 4], "little")
+    
+    def find_band(self, min_difficulty: int=0, max_difficulty: int=None) -> tuple[int, int]:
+        """
+        Find the solvable deals in a band of difficulty by binary search.
+        
+        Parameters:
+        - min_difficulty: minimum difficulty score
+        - max_difficulty: maximum difficulty score, no limit if not given
+        
+        Return:
+        The range of indexes in format (start, end), end is excluded
+        """
+        def bound(score: int) -> int:
+            lo, hi = 0, self.solvable_num
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.difficulty(mid) < score: lo = mid + 1
+                else: hi = mid
+            return lo
+        end = bound(max_difficulty + 1) if max_difficulty != None else self.solvable_num
+        return bound(min_difficulty), end
+    
+    def pick(self, min_difficulty: int=0, max_difficulty: int=None) -> int:
+        """
+        Pick a random solvable deal in a band of difficulty.
+        
+        Parameters:
+        - min_difficulty: minimum difficulty score
+        - max_difficulty: maximum difficulty score, no limit if not given
+        
+        Return:
+        The index of the deal, -1 if there's no deal in the band
+        """
+        start, end = self.find_band(min_difficulty, max_difficulty)
+        return randrange(start, end) if start < end else -1
+    
+    def close(self) -> None:
+        """
+        Close the library.
+        """
+        self.data.close()
+
+def build_library(path: str, results: list[tuple[int, int, int, int, float]]) -> int:
+    """
+    Write a deal library from the results of validating deals. The file is replaced atomically.
+    The difficulty score of a deal is the number of positions searched to solve it.
+    
+    Parameters:
+    - path: path of the library file
+    - results: results in format (seed, solvable, solution length, nodes, seconds)
+    
+    Return:
+    Number of deals written
+    """
+    deals = {r[0]: r for r in results}
+    order = sorted(deals.values(), key=lambda r: (r[1] != 1, r[3], r[0]))
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(order), sum(1 for r in order if r[1] == 1)))
+        for seed, solvable, length, nodes, _ in order:
+            ids = generate_deal(seed).data[:CARD_NUM]
+            f.write(RECORD.pack(ids, seed, min(nodes, 0xFFFFFFFF), length, solvable))
+    os.replace(temp, path)
+    return len(order)
+
+def main(argv: list[str]=None) -> None:
+    """
+    Build a deal library from the output files of ValidateDeals.py.
+    """
+    parser = ArgumentParser(description="Build a library of validated Scorpion Solitaire deals.")
+    parser.add_argument("output", help="path of the library file")
+    parser.add_argument("results", nargs="+", help="output files of ValidateDeals.py")
+    args = parser.parse_args(argv)
+    results = []
+    for r in args.results: results.extend(read_results(r))
+    num = build_library(args.output, results)
+    print(f"{num} deals written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,35 @@
 from Card import *
+from Layout import card_position
 from tkinter import Canvas, Tk
+from time import perf_counter
 
 FRAME_RATE = 8
 """ Image move every n millionseconds when moving cards to destination position """
 
+MOVE_TIME = 0.064
+""" Time taken by a card to move to its destination position in seconds """
+
+DRAG_TAG = "Drag"
+""" Tag shared by the cards being dragged """
+
+MESSAGE_TAG = "Message"
+""" Tag shared by the texts shown to the user, removed when a game is dealt """
+
+def load_images(names: list[str]) -> dict[str, "ImageTk.PhotoImage"]:
+    """
+    Load images from the image folder resized to the size of the cards. The resized images are cached.
+    PIL is imported here, so the module can be imported without loading PIL.
+    
+    Parameters:
+    - names: names of the image files without extension
+    
+    Return:
+    The resized images with names
+    """
+    from PIL import ImageTk
+    from SpriteCache import load_sprites
+    return {name: ImageTk.PhotoImage(image) for name, image in load_sprites(names, CARD_WIDTH, CARD_HEIGHT).items()}
+
 class GameCanvas(Canvas):
     """
     Represent the canvas that displays playing cards in the game
@@ -17,78 +43,291 @@ class GameCanvas(Canvas):
         - root: root component
         """
         super().__init__(root)
+        self.tweens: dict[str, tuple[list[Card], int, int, int, int, float]] = {}
+        """ Cards being moved with the tag of a card or a group of cards, in format (cards, start x, start y,
+        destination x, destination y, start time). The position is the position of the first card, the other cards
+        of a group keep their distance to the first card.
+        """
+        self.groups: dict[str, str] = {}
+        """ Tags of the groups being moved with the tags of their cards """
+        self.group_num: int = 0
+        """ Number of groups created, used to name the groups """
+        self.frame_id = None
+        """ Id returned by after() for the next frame, None if no card is moving """
+        self.frame_cost: float = 0.0
+        """ Time taken by the last frame in seconds """
+        self.frame_num: int = 0
+        """ Number of frames drawn """
+        self.images: dict[str, "ImageTk.PhotoImage"] = {}
+        """ Images shown by the cards created on the canvas, with the tags of the cards """
+        self.item_ops: int = 0
+        """ Number of changes of position, image and stacking order made to the cards outside of animations """
+        self.status_id = None
+        """ Id of the text showing the status of the game, None if not created """
+        self.frame_due: float = 0.0
+        """ Time the next frame is due """
+        self.telemetry = None
+        """ Telemetry recording the frames, None if not enabled """
+        self.overlay_id = None
+        """ Id of the text showing the telemetry, None if not shown """
     
     def create_cards(self, cards:list[Card], drag=None, release=None) -> None:
         """
-        Create a list of cards on the canvas
+        Create a list of cards on the canvas and place them at the top-left corner. The cards are created once,
+        later calls reuse them and only move the cards that are not at the corner.
         
         Parameters:
         - cards: list of cards
         - drag: action called when a card is being dragging
         - release: action called when a card is release from drag or click
         """
-        self.delete("all")
-        for card in cards:
-            self.create_image(card.x, card.y, image=card.image, tag=card.tag, anchor="nw")
-            self.tag_bind(card.tag, "<B1-Motion>", drag)
-            self.tag_bind(card.tag, "<ButtonRelease-1>", release)
+        for tag in set(self.groups.values()): self.dtag(tag, tag)
+        self.tweens.clear()
+        self.groups.clear()
+        self.dtag(DRAG_TAG, DRAG_TAG)
+        if len(self.images) == 0:
+            self.delete("all")
+            self.status_id = None
+            self.overlay_id = None
+            for card in cards:
+                card.x = CARD_X
+                card.y = CARD_Y
+                self.create_image(card.x, card.y, image=card.image, tag=card.tag, anchor="nw")
+                self.tag_bind(card.tag, "<B1-Motion>", drag)
+                self.tag_bind(card.tag, "<ButtonRelease-1>", release)
+                self.images[card.tag] = card.image
+        else:
+            self.delete(MESSAGE_TAG)
+            for card in cards:
+                if card.x != CARD_X or card.y != CARD_Y:
+                    card.x = CARD_X
+                    card.y = CARD_Y
+                    self.moveto(card.tag, card.x, card.y)
+                    self.item_ops += 1
+    
+    def show_image(self, card: Card, image) -> None:
+        """
+        Show an image on a card, the canvas is not changed if the card already shows the image.
+        
+        Parameters:
+        - card: the card to change
+        - image: the image to show, usually the image of the card or the back side
+        """
+        if self.images.get(card.tag) is not image:
+            self.images[card.tag] = image
+            self.itemconfig(card.tag, image=image)
+            self.item_ops += 1
+    
+    def show_text(self, text: str, tag: str=None) -> None:
+        """
+        Show a text to the user on the top-left corner. The text is removed when a game is dealt.
+        
+        Parameters:
+        - text: the text to show
+        - tag: tag of the text, used to remove the text
+        """
+        tags = (MESSAGE_TAG, tag) if tag != None else MESSAGE_TAG
+        self.create_text(10, 10, tag=tags, text=text, fill="white", font=("Helvetica 20 bold"), anchor="nw")
+    
+    def show_status(self, text: str) -> None:
+        """
+        Show the status of the game on the top area between the remaining cards and the completed sets.
+        
+        Parameters:
+        - text: the status to show, an empty text hides the status
+        """
+        if self.status_id == None:
+            self.status_id = self.create_text(CARD_X + CARD_WIDTH + V_GAP, CARD_Y, text=text, fill="white",
+                                              font=("Helvetica 14 bold"), anchor="nw")
+        else:
+            self.itemconfig(self.status_id, text=text)
+    
+    def show_overlay(self, text: str) -> None:
+        """
+        Show a text above the cards on the bottom-left corner, used to show the telemetry.
+        
+        Parameters:
+        - text: the text to show, an empty text removes the overlay
+        """
+        if text == "":
+            if self.overlay_id != None: self.delete(self.overlay_id)
+            self.overlay_id = None
+            return
+        if self.overlay_id == None:
+            self.overlay_id = self.create_text(10, self.winfo_height() - 10, text=text, fill="white",
+                                               font=("Courier 10"), anchor="sw")
+        else:
+            self.itemconfig(self.overlay_id, text=text)
+        self.lift(self.overlay_id)
     
     def start_move_card(self, card: Card, h_gap:int=H_GAP) -> None:
         """
         Place a card to its corresponding position based on the given horizontal gap between cards.
+        A card that is already at or moving to the position is left as it is.
         
         Parameters:
         - card: the card to move.
         - h_gap: the horizontal gap between the top of each card on a stack
         """
-        if card.move_id != None: self.after_cancel(card.move_id)
+        dest_x, dest_y = card_position(card.stack_idx, card.card_idx, h_gap)
+        tween = self.tweens.get(self.groups.get(card.tag, card.tag))
+        if tween != None:
+            dx = card.x - tween[0][0].x
+            dy = card.y - tween[0][0].y
+            if tween[3] + dx == dest_x and tween[4] + dy == dest_y: return
+        elif card.x == dest_x and card.y == dest_y:
+            return
         self.lift(card.tag)
-        dest_x = CARD_X + card.stack_idx * (CARD_WIDTH + V_GAP)
-        dest_y = CARD_Y + CARD_HEIGHT + H_GAP + card.card_idx * h_gap
-        move_x = (dest_x - card.x) // FRAME_RATE
-        move_y = (dest_y - card.y) // FRAME_RATE
-        self.move_card(card, dest_x, dest_y, move_x, move_y)
+        self.item_ops += 1
+        self.move_card(card, dest_x, dest_y)
     
-    def collect_finished(self, cards: list[Card], num: int) -> None:
+    def start_move_cards(self, cards: list[Card], h_gap:int=H_GAP) -> None:
         """
-        Collect a completed set of cards by moving them to top-right area.
+        Place a sub-stack of cards to their corresponding position based on the given horizontal gap between cards.
+        If the cards are already placed with the same gap, they are moved as one group.
         
         Parameters:
-        - cards: completed set of cards
-        - num: the number of completed set used to calculate destination
-        """
-        dest_x = CARD_X + (2 + num) * (CARD_WIDTH + V_GAP)
-        for card in cards:
-            self.tag_unbind(card.tag, "<Button-1>")
-            if card.move_id != None: self.after_cancel(card.move_id)
-            card.hidden = True
-            move_x = (dest_x - card.x) // FRAME_RATE
-            move_y = (CARD_Y - card.y) // FRAME_RATE
-            self.lift(card.tag)
-            self.move_card(card, dest_x, CARD_Y, move_x, move_y)
-    
-    def move_card(self, card: Card, dest_x: int, dest_y: int, move_x: int, move_y: int) -> None:
-        """
-        Helper method to create animation of moving card.
+        - cards: the cards to move, from top to bottom.
+        - h_gap: the horizontal gap between the top of each card on a stack
+        """
+        first = cards[0]
+        dest_x, dest_y = card_position(first.stack_idx, first.card_idx, h_gap)
+        if all(c.x == first.x and c.y == first.y + i * h_gap for i, c in enumerate(cards)):
+            tag = f"Group{self.group_num}"
+            self.group_num += 1
+            for c in cards:
+                self.stop_card(c)
+                self.addtag_withtag(tag, c.tag)
+                self.groups[c.tag] = tag
+            self.lift(tag)
+            self.tweens[tag] = (cards, first.x, first.y, dest_x, dest_y, perf_counter())
+            if self.frame_id == None: self.schedule_frame()
+        else:
+            for c in cards: self.start_move_card(c, h_gap)
+    
+    def move_card(self, card: Card, dest_x: int, dest_y: int) -> None:
+        """
+        Start the animation of moving card from its current position. If the card is moving, it turns to
+        the new destination.
         
         Parameters:
         - card: the card to move.
         - dest_x: destination x coordinate of the card.
         - dest_y: destination y coordinate of the card.
-        - move_x: how much should the card shift from its current position to the right in one move.
-        - move_y: how much should the card shift from its current position to the bottom in one move.
-        """
-        # Adjust the length of move for the last move of a card
-        if move_x != 0 and card.x == dest_x: move_x = 0
-        elif abs(move_x) > abs(dest_x - card.x): move_x = dest_x - card.x
-        if move_y != 0 and card.y == dest_y: move_y = 0
-        elif abs(move_y) > abs(dest_y - card.y): move_y = dest_y - card.y
-        # Move the card and update current position
-        self.move(card.tag, move_x, move_y)
-        card.x += move_x
-        card.y += move_y
-        # Continue to move card until the card is placed in its destination position
-        if card.x != dest_x or card.y != dest_y:
-            card.move_id = self.after(FRAME_RATE, lambda: self.move_card(card, dest_x, dest_y, move_x, move_y))
-        else:
-            card.move_id = None
\ No newline at end of file
+        """
+        self.leave_group(card)
+        self.tweens[card.tag] = ([card], card.x, card.y, dest_x, dest_y, perf_counter())
+        if self.frame_id == None: self.schedule_frame()
+    
+    def stop_card(self, card: Card) -> None:
+        """
+        Stop moving a card, the card stays where it is.
+        
+        Parameters:
+        - card: the card to stop.
+        """
+        self.leave_group(card)
+        self.tweens.pop(card.tag, None)
+    
+    def leave_group(self, card: Card) -> None:
+        """
+        If the card is moving in a group, split the group so each card of the group keeps moving on its own.
+        
+        Parameters:
+        - card: the card to leave its group
+        """
+        tag = self.groups.get(card.tag)
+        if tag != None:
+            cards, x, y, dest_x, dest_y, t = self.tweens.pop(tag)
+            for c in cards:
+                del self.groups[c.tag]
+                self.dtag(c.tag, tag)
+                dx = c.x - cards[0].x
+                dy = c.y - cards[0].y
+                self.tweens[c.tag] = ([c], x + dx, y + dy, dest_x + dx, dest_y + dy, t)
+    
+    def start_drag(self, cards: list[Card], x: int, y: int) -> None:
+        """
+        Stop moving the cards and place them at the mouse position as one group to drag.
+        
+        Parameters:
+        - cards: the cards to drag, from top to bottom
+        - x: x coordinate of the first card
+        - y: y coordinate of the first card
+        """
+        for i, c in enumerate(cards):
+            self.stop_card(c)
+            c.x = x
+            c.y = y + i * H_GAP
+            self.moveto(c.tag, c.x, c.y)
+            self.addtag_withtag(DRAG_TAG, c.tag)
+        self.lift(DRAG_TAG)
+    
+    def drag_to(self, cards: list[Card], x: int, y: int) -> None:
+        """
+        Move the dragged cards with one move of their group.
+        
+        Parameters:
+        - cards: the cards being dragged, from top to bottom
+        - x: new x coordinate of the first card
+        - y: new y coordinate of the first card
+        """
+        dx = x - cards[0].x
+        dy = y - cards[0].y
+        self.move(DRAG_TAG, dx, dy)
+        for c in cards:
+            c.x += dx
+            c.y += dy
+    
+    def end_drag(self) -> None:
+        """
+        Remove the group of dragged cards.
+        """
+        self.dtag(DRAG_TAG, DRAG_TAG)
+    
+    def draw_frame(self) -> None:
+        """
+        Move all moving cards in one frame. The position of a card depends on the time since it starts to move,
+        so slow frames don't make the animation longer.
+        """
+        start = perf_counter()
+        due = self.frame_due
+        done = []
+        for tag, (cards, x, y, dest_x, dest_y, t) in self.tweens.items():
+            p = (start - t) / MOVE_TIME
+            if p >= 1:
+                new_x, new_y = dest_x, dest_y
+                done.append(tag)
+            else:
+                new_x = x + round((dest_x - x) * p)
+                new_y = y + round((dest_y - y) * p)
+            # Move the cards and update current position
+            dx = new_x - cards[0].x
+            dy = new_y - cards[0].y
+            self.move(tag, dx, dy)
+            for c in cards:
+                c.x += dx
+                c.y += dy
+        for tag in done:
+            cards = self.tweens.pop(tag)[0]
+            if self.groups.get(cards[0].tag) == tag:    # Remove the finished group
+                for c in cards: del self.groups[c.tag]
+                self.dtag(tag, tag)
+        # Continue to draw frames until all cards are placed in their destination position
+        self.frame_id = None
+        if len(self.tweens) > 0: self.schedule_frame()
+        self.frame_num += 1
+        self.frame_cost = perf_counter() - start
+        if self.telemetry != None: self.telemetry.frame(start - due, self.frame_cost, FRAME_RATE / 1000)
+    
+    def schedule_frame(self) -> None:
+        """
+        Draw the next frame after FRAME_RATE milliseconds.
+        """
+        self.frame_due = perf_counter() + FRAME_RATE / 1000
+        self.frame_id = self.after(FRAME_RATE, self.draw_frame)
+    
+    @property
+    def tween_num(self) -> int:
+        """ Number of animations running, a group of cards counts as one """
+        return len(self.tweens)
\ No newline at end of file
@@ -5,26 +5,39 @@ A scorpion solitarie game.
 __author__ = "Jiameng Li"
 __version__= "1.0"
 __date__= "19 January 2024"
-__name__="__main__"
+
+from time import perf_counter
+START_TIME = perf_counter()
+""" Time the module starts to load, used to measure the startup time """
 
 import ctypes
+import os
+import sys
+import time
+from struct import error as struct_error
 from Card import *
 from CardSet import *
 from GameCanvas import *
+from Layout import *
+from DealLibrary import DealLibrary
+from HintWorker import HintWorker
+from SaveGame import load_game, save_game
+from Telemetry import Telemetry
+from Trace import Trace, MOVE, UNDO, REDO, RESTART
+from multiprocessing import freeze_support
 from tkinter import *
-from PIL import Image, ImageTk
 
 
 # --------------- Constants ---------------
 
-ROOT = Tk()
-""" Game window """
+ROOT: Tk = None
+""" Game window, created by setup() """
 
-CANVAS = GameCanvas(ROOT)
-""" Canvas the display cards """
+CANVAS: GameCanvas = None
+""" Canvas the display cards, created by setup() """
 
-MENU = Menu(ROOT)
-""" Menu on the top """
+MENU: Menu = None
+""" Menu on the top, created by setup() """
 
 WIN_WIDTH = 940
 """ Width of the game window """
@@ -32,16 +45,44 @@ WIN_WIDTH = 940
 WIN_HEIGHT = 900
 """ Height of the game window """
 
-BACKSIDE_IMAGE = ImageTk.PhotoImage(Image.open("src/img/backside.png")
-                                    .resize((CARD_WIDTH, CARD_HEIGHT), resample=Image.LANCZOS))
-""" Image of the back side of the playing card """
-
-ALL_CARDS: dict[str, Card] = {t + str(v): Card(t, v) for t in ["club", "diamond", "heart", "spade"] 
-                         for v in range(1, 14)}
+ALL_CARDS: dict[str, Card] = make_cards()
 """ All playing cards that will be used in the game """
 
-MAX_IN_STACK = 16
-""" Maximum number of visible cards in a stack without shrinking the stack """
+CARD_IMAGES: dict[str, "ImageTk.PhotoImage"] = None
+""" Images of the cards with tags, and the back side with tag 'backside', loaded by setup() """
+
+BACKSIDE_IMAGE: "ImageTk.PhotoImage" = None
+""" Image of the back side of the playing card, loaded by setup() """
+
+HOVER_DELAY = 200
+""" Number of milliseconds the mouse stays on a card before the card shifts up """
+
+DEAL_LIBRARY_PATH = "src/deals.bin"
+""" Path of the library of validated deals used for new games, if the file exists """
+
+DEAL_DIFFICULTY = (0, None)
+""" Band of difficulty scores of the deals picked from the deal library """
+
+SAVE_PATH = "src/save.bin"
+""" Path of the game in progress saved on exit """
+
+STATS_PATH = "src/stats.json"
+""" Path the telemetry is written to on exit, if '--stats' is given """
+
+OVERLAY_DELAY = 500
+""" Number of milliseconds between updates of the telemetry overlay """
+
+SAMPLE_DELAY = 100
+""" Number of milliseconds between samples of the pending after() callbacks, if '--stats' is given """
+
+WINNABLE_DELAY = 300
+""" Number of milliseconds without a move before checking whether the game can still be won """
+
+TRACE_DIR = "src/traces"
+""" Folder of the traces of the games played, they can be replayed by Trace.py """
+
+TRACE_NUM = 100
+""" Number of traces kept in the folder, the oldest traces are removed """
 
 
 # --------------- Global variables ---------------
@@ -49,109 +90,204 @@ MAX_IN_STACK = 16
 my_cards: CardSet = CardSet(ALL_CARDS)
 """ A card set that contains all cards used in the game """
 
+my_layout: Layout = Layout()
+""" Target positions of the cards on the canvas """
+
 my_closet: str = None
 """ The tag of the card closest to the mouse """
 
+my_mouse: tuple[int, int] = (0, 0)
+""" The last position of the mouse on the canvas """
+
+my_hover_id: str = None
+""" Id returned by after() for the pending shift of the hovered card, None if no shift is pending """
+
+my_hover_scheduled = 0
+""" Number of times the shift of the hovered card is scheduled """
+
+my_hover_executed = 0
+""" Number of times the shift of the hovered card is executed, the rest are cancelled by later mouse motions """
+
 my_dragging = False
 """ Whether the user is dragging cards """
 
 my_drag_cards: list[Card] = None
 """ The list of cards being dragging """
 
+my_hint_pending = False
+""" Whether a hint arrived while dragging, the hint is searched again for the position after the drag """
+
 my_started = False
 """ Whether the game has started """
 
 my_no_move = False
 """ Whether there's no more moves """
 
+my_library: DealLibrary = None
+""" Library of validated deals, opened at the first new game """
+
+my_hints: HintWorker = None
+""" Search for hints running in a worker process, created by setup() """
+
+my_winnable: BooleanVar = None
+""" Whether to show if the game can still be won, set by the menu and created by setup() """
+
+my_telemetry: Telemetry = None
+""" Times of the event handlers and frames, created by setup() if '--stats' is given """
+
+my_overlay_id: str = None
+""" Id returned by after() for the next update of the telemetry overlay, None if the overlay is hidden """
+
+my_winnable_id: str = None
+""" Id returned by after() for the pending check of whether the game can still be won, None if not pending """
+
+my_trace: Trace = None
+""" Actions taken in the current game, None if no game has started """
+
 
 # --------------- Functions for operating the game ---------------
 
-def deal_cards() -> None:
+def deal_cards(seed: int=None, state: CardState=None) -> None:
     """
     Deal a list of cards and place them on canvas.
-    If old stacks in not empty, means it's restarting the game. In this case, use old atacks.
-    Else, shuffle cards.
+    If the start state is saved, means it's restarting the game. In this case, use the start state.
+    Else, use the given deal or shuffle cards.
+    
+    Parameters:
+    - seed: seed of the deal
+    - state: the state after dealing, shuffle cards if not given
     """   
-    # Create cards on canvas
-    CANVAS.create_cards(ALL_CARDS.values(), drag_card, release_card)
+    # Create cards on canvas, or gather the cards of the last game
+    CANVAS.create_cards(ALL_CARDS.values(), timed("drag", drag_card), timed("release", release_card))
     
     # Shuffle cards      
-    if len(my_cards.old_stacks) > 0: 
-        for x in my_cards.old_stacks: my_cards.stacks.append(x.copy())
-    else: 
-        my_cards.shuffle_cards()
-        #my_cards.test_shuffle()
-        for x in my_cards.stacks: my_cards.old_stacks.append(x.copy())
-        
-    # Hide some cards by displaying the backside of the card
-    for i in [0, 1, 2, 3, 7]:
-        for card in my_cards.stacks[i][:3]:
-            card.hidden = True
-            CANVAS.itemconfig(card.tag, image=BACKSIDE_IMAGE)
-    
+    my_cards.deal(seed, state)
+    show_cards()
+
+def show_cards() -> None:
+    """
+    Show the side of each card that matches whether the card is hidden, and move the cards from the top-left
+    corner to their stacks.
+    """
+    ROOT.title(f"Scorpion Solitaire - Deal #{my_cards.seed}")
+    # Hide some cards by displaying the backside of the card, only the cards that change are updated
+    for card in ALL_CARDS.values():
+        CANVAS.show_image(card, BACKSIDE_IMAGE if card.hidden else card.image)
     # Place cards on canvas
-    for i in range(7):
-        for j in range(len(my_cards.stacks[i])):
-            CANVAS.start_move_card(my_cards.stacks[i][j])
+    my_layout.reset(ALL_CARDS.values())
+    for i in range(len(my_cards.stacks)): place_stack(i)
+
+def resume_game() -> bool:
+    """
+    Load the game saved on exit and place the cards, the cards are not shuffled.
+    
+    Return:
+    Whether a saved game is loaded
+    """
+    global my_started
+    if not load_game(SAVE_PATH, my_cards): return False
+    CANVAS.create_cards(ALL_CARDS.values(), timed("drag", drag_card), timed("release", release_card))
+    show_cards()
+    start_trace()
+    my_started = True
+    check_winnable()
+    return True
+
+def start_trace() -> None:
+    """
+    Start recording the actions of the current game. The actions that reach the current position are
+    recorded first, so the trace of a resumed game starts from the beginning of the game.
+    """
+    global my_trace
+    my_trace = Trace.from_game(my_cards)
+
+def save_trace() -> None:
+    """
+    Write the trace of the current game to the trace folder if any action is taken, and remove the oldest
+    traces if there're too many.
+    """
+    if my_trace == None or len(my_trace) == 0: return
+    try:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{my_cards.seed if my_cards.seed != None else 'x'}.sctr"
+        my_trace.save(os.path.join(TRACE_DIR, name), my_cards.snapshot())
+        traces = sorted(n for n in os.listdir(TRACE_DIR) if n.endswith(".sctr"))
+        for n in traces[:-TRACE_NUM]: os.remove(os.path.join(TRACE_DIR, n))
+    except OSError:     # Recording never stops the game
+        pass
 
 def hover_card(e) -> None:
     """
     Make the card shift up after hovering the card for 1/5 second.
+    Only one shift is pending at a time, each mouse motion restarts the delay.
     """
-    x = e.x
-    y = e.y
-    CANVAS.after(200, lambda: shift_card(e, x, y))
+    global my_mouse, my_hover_id, my_hover_scheduled
+    my_mouse = (e.x, e.y)
+    if my_hover_id != None: CANVAS.after_cancel(my_hover_id)
+    my_hover_id = CANVAS.after(HOVER_DELAY, hover_timeout)
+    my_hover_scheduled += 1
 
-def shift_card(e, x=None, y=None, clicked=False) -> None:
+def hover_timeout() -> None:
     """
-    Shift the card up when the mouse hovering the card, and down when leave.
+    Shift the card under the mouse after the mouse stops moving.
+    """
+    global my_hover_id, my_hover_executed
+    my_hover_id = None
+    my_hover_executed += 1
+    shift_card()
+
+def card_at(x: int, y: int) -> Card:
+    """
+    Find the visible card at a position from the positions of the cards, without asking the canvas.
     
     Parameters:
-    - x: x coordinate of the mouse 1/5 second ago.
-    - y: y coordinate of the mouse 1/5 second ago.
-    - clicked: whether the card is clicked and is moving to another stack. In this case, always shift down.
+    - x: x coordinate of the position
+    - y: y coordinate of the position
+    
+    Return:
+    The top card at the position, None if there's no card
     """
-    global my_closet
-    if clicked or e == None or (e.x == x and e.y == y):
-        tags = CANVAS.gettags("current")
-        if "NoMove" not in tags:
-            different_card = len(tags) > 1 and tags[0] != my_closet
-            # Shift previous card down
-            if my_closet != None and (clicked or different_card or len(tags) < 2) and not my_dragging:
-                ALL_CARDS[my_closet].move_id = CANVAS.move(my_closet, 0, H_GAP - 5)
-                my_closet = None
-            # shift next card up
-            if len(tags) > 1 and different_card and not ALL_CARDS[tags[0]].hidden and not clicked and not my_dragging:
-                my_closet = tags[0]
-                ALL_CARDS[my_closet].move_id = CANVAS.move(my_closet, 0, -(H_GAP - 5))
-
-def shrink_stack(stack_idx: int, old_len: int) -> None:
-    """
-    Shrink the stack when some cards are moved to the stack and the number of cards is greater than
-    maximum visible number.
+    i = (x - CARD_X) // (CARD_WIDTH + V_GAP)
+    if 0 <= i < 7:
+        for c in reversed(my_cards.stacks[i]):
+            top = c.y - (H_GAP - 5) if c.tag == my_closet else c.y
+            if c.x <= x < c.x + CARD_WIDTH and top <= y < top + CARD_HEIGHT: return c
+    return None
+
+def shift_card(clicked=False) -> None:
+    """
+    Shift the card up when the mouse hovering the card, and down when leave.
     
     Parameters:
-    - stack_idx: the index of the stack to shrink
-    - old_len: the length of the stack cards are moved
+    - clicked: whether the card is clicked and is moving to another stack. In this case, always shift down.
     """
-    new_len = len(my_cards.stacks[stack_idx])
-    if new_len > MAX_IN_STACK and new_len > old_len:
-        gap = (H_GAP * MAX_IN_STACK) // new_len
-        for c in my_cards.stacks[stack_idx]: CANVAS.start_move_card(c, gap)
+    global my_closet
+    card = card_at(*my_mouse) if not clicked else None
+    different_card = card != None and card.tag != my_closet
+    # Shift previous card down
+    if my_closet != None and (clicked or different_card or card == None) and not my_dragging:
+        CANVAS.move(my_closet, 0, H_GAP - 5)
+        my_closet = None
+    # shift next card up
+    if different_card and not card.hidden and card.stack_idx < 7 and not my_dragging:
+        my_closet = card.tag
+        CANVAS.move(my_closet, 0, -(H_GAP - 5))
 
-def stretch_stack(stack_idx: int, old_len: int) -> None:
+def place_stack(stack_idx: int, moved: list[Card]=None) -> None:
     """
-    Stretch the stack when some cards are moved to another stack, if the stack is shrinked.
+    Move the cards of a stack whose target position changed, so the stack shrinks or stretches to fit
+    the window. The other cards of the stack are left as they are. The cards moved to the stack, or
+    dragged from it, are always moved, as one group if possible.
     
     Parameters:
-    - stack_idx: the index of the stack to stretch
-    - old_len: the length of the stack cards are moved
+    - stack_idx: the index of the stack to place
+    - moved: the cards moved to the stack or dragged from it, from top to bottom
     """
-    new_len = len(my_cards.stacks[stack_idx])
-    if new_len > 1 and new_len < old_len and old_len > MAX_IN_STACK:
-        gap = (H_GAP * MAX_IN_STACK) // new_len if new_len > MAX_IN_STACK else H_GAP
-        for c in my_cards.stacks[stack_idx]: CANVAS.start_move_card(c, gap)
+    stack = my_cards.stacks[stack_idx]
+    gap = stack_gap(len(stack))
+    for c in my_layout.place(stack):
+        if moved == None or c.card_idx < moved[0].card_idx: CANVAS.start_move_card(c, gap)
+    if moved != None: CANVAS.start_move_cards(moved, gap)
 
 def check_win(stack_idx: int) -> None:
     """
@@ -163,11 +299,15 @@ def check_win(stack_idx: int) -> None:
     """
     global my_started
     while my_cards.check_stack(stack_idx): 
-        CANVAS.collect_finished(my_cards.stacks[7 + my_cards.win_num], my_cards.win_num)
-        stretch_stack(stack_idx, len(my_cards.stacks[stack_idx]) - 13)
-    if my_cards.win_num == 4:
+        place_stack(7 + my_cards.win_num)
+        place_stack(stack_idx)
+        # Show the card revealed after collecting the set, if any
+        if len(my_cards.stacks[stack_idx]) > 0:
+            top = my_cards.stacks[stack_idx][-1]
+            CANVAS.show_image(top, top.image)
+    if my_cards.is_won():
         my_started = False
-        CANVAS.create_text(10, 10, text="YOU WIN!", fill="white", font=("Helvetica 20 bold"), anchor="nw")
+        CANVAS.show_text("YOU WIN!")
 
 
 # --------------- Actions that response to mouse events ---------------
@@ -176,62 +316,43 @@ def click_remaining() -> None:
     """
     Action when the stack of remaining cards on the topleft corner is clicked.
     """
-    if my_started and len(my_cards.stacks[7]) == 3:
-        for i in reversed(range(3)):
-            c = my_cards.stacks[7][i]
-            c.hidden = False
-            CANVAS.itemconfig(c.tag, image=c.image)
-            my_cards.switch_stack(7, i, 1)
-            gap = (H_GAP * MAX_IN_STACK) // len(my_cards.stacks[i]) \
-                if len(my_cards.stacks[i]) > MAX_IN_STACK else H_GAP
-            CANVAS.start_move_card(c, gap)
-            shrink_stack(i, len(my_cards.stacks[i]) - 1)
-
-def click_card(checked=False, card=None, target=None, first_empty=0) -> None:
+    if my_started:
+        my_hints.cancel()
+        dealt = my_cards.deal_remaining()
+        if len(dealt) > 0: my_trace.add(MOVE, *DEAL_MOVE)
+        for c in dealt:
+            CANVAS.show_image(c, c.image)
+            place_stack(c.stack_idx, [c])
+        check_winnable()
+
+def click_card(card: Card=None, dest: int=-1) -> None:
     """
     Check whether the clicked card is movable. If so, move the clicked card and cards below it
     to the right stack.
-    There're two possible valid moves:
-    1. The last card in a stack (except for the stack of clicked card) has same type as clicked card
-       and has value exactly one greater than the clicked card.
-    2. The clicked card has value 13 and there's at least one empty stack. In this case,
-       move to the leftmost empty stack.
        
     Parameters:
-    - checked: whether the move has been checked to be valid. If true, it must specify the parameter card and
-               either target or first empty
-    - card: the card clicked (or dragged)
-    - target: the target card that the clicked card will be moving toward to
-    - first_empty: the index of first empty stack from left to right
+    - card: the card clicked (or dragged). If not given, use the card under the mouse and find its destination.
+    - dest: the destination stack, must be a valid move if card is given
     """
-    if not checked:
+    if card == None:
         card = ALL_CARDS[CANVAS.gettags("current")[0]]
-        target = ALL_CARDS[card.type + str(card.value + 1)] if card.value != 13 else None
-        first_empty = 0
-        while len(my_cards.stacks[first_empty]) != 0 and first_empty < 7: first_empty += 1
-    if checked or ((target != None and not target.hidden and target.stack_idx != card.stack_idx \
-            and target.card_idx == len(my_cards.stacks[target.stack_idx]) - 1) \
-            or (card.value == 13 and first_empty < 7)):
+        dest = my_cards.find_dest(card)
+    if dest >= 0:
+        my_hints.cancel()
         old_s = card.stack_idx
-        new_s = target.stack_idx if target != None else first_empty
-        length = len(my_cards.stacks[new_s])
-        gap = (H_GAP * MAX_IN_STACK) // len(my_cards.stacks[new_s]) \
-            if len(my_cards.stacks[new_s]) > MAX_IN_STACK else H_GAP
         temp = my_cards.stacks[old_s][card.card_idx:]
-        # Move cards to the right stack
-        my_cards.switch_stack(old_s, new_s, len(temp))
-        shift_card(None, True)
-        for c in temp: 
-            CANVAS.start_move_card(c, gap)
+        # Move cards to the right stack, the stack shrinks if needed
+        reveal = my_cards.move_cards(card, dest)
+        my_trace.add(MOVE, old_s, dest, len(temp))
+        shift_card(clicked=True)
+        place_stack(dest, temp)
         # Reveal the hidden card after move, if any
-        reveal = my_cards.stacks[old_s][-1] if len(my_cards.stacks[old_s]) > 0 else None
-        if reveal != None and reveal.hidden:
-            reveal.hidden = False
-            CANVAS.itemconfig(reveal.tag, image=reveal.image)
-        # Stretch or shrink stacks to fit window
-        shrink_stack(new_s, length)
-        stretch_stack(old_s, len(my_cards.stacks[old_s]) + len(temp))
-        check_win(new_s)
+        if reveal != None:
+            CANVAS.show_image(reveal, reveal.image)
+        # Stretch the stack the cards leave
+        place_stack(old_s)
+        check_win(dest)
+        check_winnable()
                     
 def drag_card(e) -> None:
     """
@@ -243,46 +364,41 @@ def drag_card(e) -> None:
         my_dragging = True
         my_closet = None
         card = ALL_CARDS[CANVAS.gettags("current")[0]]
-        my_drag_cards = my_cards.stacks[card.stack_idx][card.card_idx:] if not card.hidden else None
+        my_drag_cards = my_cards.stacks[card.stack_idx][card.card_idx:] \
+            if not card.hidden and card.stack_idx < 7 else None
+        if my_drag_cards != None: CANVAS.start_drag(my_drag_cards, e.x - CARD_WIDTH // 2, e.y)
     if my_drag_cards != None:
-        for i in range(len(my_drag_cards)):
-            c = my_drag_cards[i]
-            c.x = e.x - CARD_WIDTH // 2
-            c.y = e.y + i * H_GAP
-            CANVAS.lift(c.tag)
-            c.move_id = CANVAS.moveto(c.tag, c.x, c.y)
+        CANVAS.drag_to(my_drag_cards, e.x - CARD_WIDTH // 2, e.y)
 
 def release_card(e) -> None:
     """
     After release the cards from drag or click evetn, move cards to either their destination
     stack or original stack.
     """
-    global my_dragging, my_drag_cards
+    global my_dragging, my_drag_cards, my_hint_pending
     # Release from drag
     if my_dragging and my_drag_cards != None:
         # Determine whether the move is valid and, if so, witch stack
         old_stack = my_drag_cards[0].stack_idx
         dest_stack: int = (e.x - CARD_X) // (CARD_WIDTH + V_GAP)
-        if (len(my_cards.stacks[dest_stack]) == 0):
-            if my_drag_cards[0].value == 13: 
-                click_card(True, my_drag_cards[0], None, dest_stack)
-        else:
-            target = my_cards.stacks[dest_stack][-1]
-            if my_drag_cards[0].type == target.type and my_drag_cards[0].value == target.value - 1:
-                click_card(True, my_drag_cards[0], target)
+        if my_cards.can_move(my_drag_cards[0], dest_stack):
+            click_card(my_drag_cards[0], dest_stack)
         # If the move is invalid, move cards back to teir original stack
         if old_stack == my_drag_cards[0].stack_idx:
-            gap = (H_GAP * MAX_IN_STACK) // len(my_cards.stacks[my_drag_cards[0].stack_idx]) \
-                  if len(my_cards.stacks[my_drag_cards[0].stack_idx]) > MAX_IN_STACK else H_GAP
-            for c in my_drag_cards: CANVAS.start_move_card(c, gap)
+            place_stack(old_stack, my_drag_cards)
+        CANVAS.end_drag()
         my_drag_cards = None
-        my_dragging = False
     # Release from clicking the remaining cards
     elif e.y >= CARD_Y and e.y <= CARD_Y + CARD_HEIGHT and e.x >= CARD_X and e.x <= CARD_X + CARD_WIDTH:
         click_remaining()
     # Release from clicking a card in visible stack
     elif e.y > CARD_Y + CARD_HEIGHT:
         click_card()
+    # The drag ends, including a drag of hidden cards that moves nothing
+    my_dragging = False
+    if my_hint_pending:
+        my_hint_pending = False
+        hint()
 
 
 # --------------- Commands for the menu ---------------
@@ -294,102 +410,244 @@ def new_or_restart(new: bool) -> None:
     Parameters:
     - new: whether the user is starting a new game.
     """
-    global my_started, my_no_move, my_closet, my_drag_cards, my_dragging
+    global my_started, my_no_move, my_closet, my_drag_cards, my_dragging, my_library, my_hint_pending
+    my_hints.cancel()
+    # Shift the hovered card back, the cards are reused by the next game
+    if my_closet != None: CANVAS.move(my_closet, 0, H_GAP - 5)
+    new = new or my_trace == None     # Restarting before any game starts a new game
+    if new: save_trace()
+    else: my_trace.add(RESTART)
     my_cards.reset(new)
-    deal_cards()
+    seed = None
+    state = None
+    if new:     # Pick a validated deal from the deal library, if any
+        if my_library == None and os.path.exists(DEAL_LIBRARY_PATH):
+            try:
+                my_library = DealLibrary(DEAL_LIBRARY_PATH)
+            except (OSError, ValueError, struct_error):     # Shuffle the cards if the library is invalid
+                pass
+        i = my_library.pick(*DEAL_DIFFICULTY) if my_library != None else -1
+        if i >= 0: seed, state = my_library.record(i)[:2]
+    deal_cards(seed, state)
+    if new: start_trace()
     my_started = True
     my_no_move = False
     my_closet = None
     my_drag_cards = None
     my_dragging = False
+    my_hint_pending = False
+    check_winnable()
 
 def undo() -> None:
     """
     Undo previous step
     """
     global my_no_move
-    if my_started and len(my_cards.steps) > 0:
-        if my_no_move:     # Delete text for no more moves
+    if my_started:
+        my_hints.cancel()
+        steps = my_cards.undo()
+        if len(steps) > 0: my_trace.add(UNDO)
+        if len(steps) > 0 and my_no_move:     # Delete text for no more moves
             my_no_move = False
             CANVAS.delete("NoMove")
-        step = my_cards.steps.pop()
-        if step[0] == 7:    # Undo click on the remaining cards
-            three = [step, my_cards.steps.pop(), my_cards.steps.pop()]
-            for i in range(3):
-                step = three[i]
-                card = my_cards.stacks[step[1]][-1]
-                card.hidden = True
-                CANVAS.itemconfig(card.tag, image=BACKSIDE_IMAGE)
-                my_cards.switch_stack(step[1], 7, 1, False)
-                move_x = (CARD_X - card.x) // FRAME_RATE
-                move_y = (CARD_Y - card.y) // FRAME_RATE
-                CANVAS.move_card(card, CARD_X, CARD_Y, move_x, move_y)
-                stretch_stack(step[1], len(my_cards.stacks[step[1]]) + 1)
+        if len(steps) > 0 and steps[0][0] == 7:    # Undo click on the remaining cards
+            for card in my_cards.stacks[7]: CANVAS.show_image(card, BACKSIDE_IMAGE)
+            place_stack(7)
+            for i in range(3): place_stack(i)
         else:   # Undo regular steps
-            if step[3]:  # Hide the card if it's hidden in previous step
-                    hide = my_cards.stacks[step[0]][-1]
-                    hide.hidden = True
-                    CANVAS.itemconfig(hide.tag, image=BACKSIDE_IMAGE)
-            temp = my_cards.stacks[step[1]][len(my_cards.stacks[step[1]]) - step[2]:]
-            if step[1] > 7:     # If cards is moved a completed set
-                my_cards.win_num -= 1
-                my_cards.stacks[step[1]]
-                for c in temp: c.hidden = False
-            temp = my_cards.stacks[step[1]][len(my_cards.stacks[step[1]]) - step[2]:]
-            my_cards.switch_stack(step[1], step[0], step[2], False)
-            gap = (H_GAP * MAX_IN_STACK) // (len(my_cards.stacks[step[0]]) - step[2]) \
-                if len(my_cards.stacks[step[0]]) - step[2] > MAX_IN_STACK else H_GAP
-            for c in temp:
-                CANVAS.start_move_card(c, gap)
-            stretch_stack(step[1], len(my_cards.stacks[step[1]]) + step[2])
-            shrink_stack(step[0], len(my_cards.stacks[step[0]]) - step[2])
-            if step[1] > 7: undo()
+            for step in steps:
+                for c in my_cards.stacks[step[0]]: CANVAS.show_image(c, BACKSIDE_IMAGE if c.hidden else c.image)
+                place_stack(step[0])
+                place_stack(step[1])
+        check_winnable()
+
+def redo() -> None:
+    """
+    Make the last move undone again
+    """
+    if my_started:
+        my_hints.cancel()
+        steps = my_cards.redo()
+        if len(steps) > 0: my_trace.add(REDO)
+        for step in steps:
+            for i in step[:2]:
+                for c in my_cards.stacks[i]: CANVAS.show_image(c, BACKSIDE_IMAGE if c.hidden else c.image)
+                place_stack(i)
+        if len(steps) > 0: check_win(steps[0][1])   # The first step is always onto stack 0-6
+        check_winnable()
+
+def check_winnable() -> None:
+    """
+    Show whether the game can still be won, if enabled. A cached position is shown at once, otherwise
+    the search starts when no move is made for a while, so rapid moves don't start stale searches.
+    """
+    global my_winnable_id
+    if my_winnable_id != None:
+        CANVAS.after_cancel(my_winnable_id)
+        my_winnable_id = None
+    if not my_winnable.get() or not my_started:
+        CANVAS.show_status("")
+        return
+    result = my_hints.lookup(my_cards.snapshot())
+    if result == None and my_cards.deadlocked(): result = (None, False)    # No need to search
+    if result != None:
+        show_winnable(*result)
+    else:
+        CANVAS.show_status("Checking...")
+        my_winnable_id = CANVAS.after(WINNABLE_DELAY, winnable_timeout)
+
+def winnable_timeout() -> None:
+    """
+    Search whether the game can still be won after no move is made for a while.
+    """
+    global my_winnable_id
+    my_winnable_id = None
+    my_hints.request(my_cards.snapshot(), show_winnable)
+
+def show_winnable(move: tuple[int, int, int], solvable: bool) -> None:
+    """
+    Show the result of the search of whether the game can still be won.
+    
+    Parameters:
+    - move: the hint found by the search, not used
+    - solvable: whether the game can still be won, None if unknown
+    """
+    if my_winnable.get() and my_started:
+        CANVAS.show_status("Winnable" if solvable else "Not winnable" if solvable == False else "Winnable: unknown")
 
 def hint() -> None:
     """
-    Find an available move and trigger the click event to make the move.
-    If there's no move, notify the user.
+    Search for a hint in the worker process, the move is made when the search is done.
     """
-    global my_no_move
     if my_started and not my_no_move:
-        found = False
-        # Look for an empty spot for a 'King'(value 13)
-        for t in ["club", "diamond", "heart", "spade"]:
-            tag = t + "13"
-            if not ALL_CARDS[tag].hidden and ALL_CARDS[tag].card_idx != 0:
-                dest = 0
-                while len(my_cards.stacks[dest]) != 0 and dest < 7: dest += 1
-                if dest < 7:
-                    card = ALL_CARDS[tag]
-                    click_card(True, card, None, dest)
-                    found = True
-                    break
-        # Look for move in stacks from left to right
-        if not found:
-            for i in range(7):
-                if len(my_cards.stacks[i]) > 0:
-                    target = my_cards.stacks[i][-1]
-                    if target.value != 1:
-                        card = ALL_CARDS[target.type + str(target.value - 1)]
-                        if not card.hidden and card.stack_idx != target.stack_idx:
-                            click_card(True, card, target)
-                            found = True
-                            break
-        # Look for remaining cards
-        if not found and len(my_cards.stacks[7]) > 0:
-            click_remaining()
-            found = True
-        # Notify the user there's no more moves
-        if not found:
+        my_hints.request(my_cards.snapshot(), show_hint)
+
+def is_valid_hint(move: tuple[int, int, int]) -> bool:
+    """
+    Check whether a hint can be made in the current position, a hint may be found for an earlier position.
+    
+    Parameters:
+    - move: the move in format (src, dest, length)
+    
+    Return:
+    Whether the move is valid
+    """
+    src, dest, length = move
+    if src == 7: return move == DEAL_MOVE and len(my_cards.stacks[7]) == 3
+    return 0 <= src < 7 and 0 < length <= len(my_cards.stacks[src]) and \
+        my_cards.can_move(my_cards.stacks[src][-length], dest)
+
+def show_hint(move: tuple[int, int, int], solvable: bool=None) -> None:
+    """
+    Trigger the click event to make the move found by the hint search.
+    If there's no move, notify the user.
+    
+    Parameters:
+    - move: the move in format (src, dest, length), None if there's no more moves
+    - solvable: whether the game can still be won, not used
+    """
+    global my_no_move, my_hint_pending
+    if my_dragging:     # Make the hint after the drag, the position may change
+        my_hint_pending = True
+    elif my_started and not my_no_move:
+        if move != None and not is_valid_hint(move):   # Found for an earlier position, search again
+            hint()
+        elif move == None:    # Notify the user there's no more moves
             my_no_move = True
-            CANVAS.create_text(10, 10, tag="NoMove", text="No more moves.\nTry to undo or restart.", 
-                               fill="white", font=("Helvetica 20 bold"), anchor="nw")
+            CANVAS.show_text("No more moves.\nTry to undo or restart.", "NoMove")
+        elif move[0] == 7:
+            click_remaining()
+        else:
+            click_card(my_cards.stacks[move[0]][-move[2]], move[1])
+    
+
+def setup() -> None:
+    """
+    Create the game window and its components and load the images of the cards.
+    Nothing is created when the module is imported, so the game logic can be imported without a display.
+    """
+    global ROOT, CANVAS, MENU, CARD_IMAGES, BACKSIDE_IMAGE, my_hints, my_winnable, my_telemetry
+    ROOT = Tk()
+    CANVAS = GameCanvas(ROOT)
+    my_hints = HintWorker(ROOT)
+    my_winnable = BooleanVar(ROOT, False)
+    if "--stats" in sys.argv:
+        my_telemetry = Telemetry()
+        CANVAS.telemetry = my_telemetry
+    MENU = Menu(ROOT)
+    CARD_IMAGES = load_images(["backside"] + list(ALL_CARDS.keys()))
+    for c in ALL_CARDS.values(): c.image = CARD_IMAGES[c.tag]
+    BACKSIDE_IMAGE = CARD_IMAGES["backside"]
+
+def timed(name: str, action):
+    """
+    Parameters:
+    - name: name of the event handler
+    - action: the event handler
     
+    Return:
+    The handler that records the time it takes if the telemetry is enabled, else the given handler
+    """
+    return my_telemetry.wrap(name, action) if my_telemetry != None else action
+
+def toggle_overlay(e=None) -> None:
+    """
+    Show or hide the telemetry on the canvas.
+    """
+    global my_overlay_id
+    if my_overlay_id != None:
+        CANVAS.after_cancel(my_overlay_id)
+        my_overlay_id = None
+        CANVAS.show_overlay("")
+    else:
+        update_overlay()
+
+def update_overlay() -> None:
+    """
+    Show the latest telemetry on the canvas and update it again after a while.
+    """
+    global my_overlay_id
+    CANVAS.show_overlay(my_telemetry.summary())
+    my_overlay_id = CANVAS.after(OVERLAY_DELAY, update_overlay)
+
+def sample_pending() -> None:
+    """
+    Count the pending after() callbacks for the telemetry, and count them again after a while.
+    """
+    my_telemetry.sample_pending(ROOT)
+    ROOT.after(SAMPLE_DELAY, sample_pending)
+
+def report_startup() -> None:
+    """
+    Print the time taken to import the module and to show the game window, if '--timing' is given.
+    """
+    if "--timing" in sys.argv:
+        print(f"Import: {IMPORT_TIME * 1000:.1f} ms, startup: {(perf_counter() - START_TIME) * 1000:.1f} ms",
+              file=sys.stderr)
+
+def quit_game() -> None:
+    """
+    Stop the hint search, save the game in progress and close the game window.
+    The saved game is removed if no game is in progress.
+    """
+    my_hints.close()
+    save_trace()
+    try:
+        if my_telemetry != None: my_telemetry.dump(STATS_PATH)
+    except OSError:     # The game is still saved if the telemetry can't be written
+        pass
+    try:
+        if my_started: save_game(SAVE_PATH, my_cards)
+        elif os.path.exists(SAVE_PATH): os.remove(SAVE_PATH)
+    except OSError:     # The game still closes if it can't be saved
+        pass
+    ROOT.destroy()
 
 def main() -> None:
     """
     Set up the game window and its components and start the game.
     """
+    setup()
 
     # Set up game window
     ROOT.iconphoto(False, BACKSIDE_IMAGE)
@@ -400,19 +658,32 @@ def main() -> None:
     # Set up canvas
     CANVAS.pack(expand=True, fill=BOTH)
     CANVAS.config(background="#3B9212")
-    CANVAS.bind("<Motion>", hover_card)
+    CANVAS.bind("<Motion>", timed("hover", hover_card))
     CANVAS.create_image(CARD_X, CARD_Y, image=BACKSIDE_IMAGE, anchor="nw")
 
     # Set up menu
-    MENU.add_command(label="New Game", command=lambda: new_or_restart(True))
-    MENU.add_command(label="Restart", command=lambda: new_or_restart(False))
-    MENU.add_command(label="Undo", command=undo)
-    MENU.add_command(label="Hint", command=hint)
+    MENU.add_command(label="New Game", command=timed("new", lambda: new_or_restart(True)))
+    MENU.add_command(label="Restart", command=timed("restart", lambda: new_or_restart(False)))
+    MENU.add_command(label="Undo", command=timed("undo", undo))
+    MENU.add_command(label="Redo", command=timed("redo", redo))
+    MENU.add_command(label="Hint", command=timed("hint", hint))
+    MENU.add_checkbutton(label="Winnable", variable=my_winnable, command=check_winnable)
+    if my_telemetry != None:
+        MENU.add_command(label="Stats", command=toggle_overlay)
+        ROOT.bind("<F3>", toggle_overlay)
+        sample_pending()
     ROOT["menu"] = MENU
+    ROOT.protocol("WM_DELETE_WINDOW", quit_game)
 
-    ctypes.windll.shcore.SetProcessDpiAwareness(1)
+    if sys.platform == "win32": ctypes.windll.shcore.SetProcessDpiAwareness(1)
+    resume_game()
+    ROOT.after_idle(report_startup)
     ROOT.mainloop()
 
 
+IMPORT_TIME = perf_counter() - START_TIME
+""" Time taken to import the module in seconds """
+
 if __name__ == "__main__":
+    freeze_support()
     main()
\ No newline at end of file
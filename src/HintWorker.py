@@ -0,0 +1,181 @@
+"""
+Find hints with a search that runs in a worker process, so the game window never waits for the search.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import Value
+from Solver import *
+
+HINT_TIME = 1.0
+""" Maximum number of seconds to search for a hint """
+
+HINT_NODES = 200000
+""" Maximum number of positions to search for a hint """
+
+POLL_DELAY = 20
+""" Number of milliseconds between checks of whether the search is done """
+
+CACHE_SIZE = 4096
+""" Maximum number of positions whose hints are kept """
+
+_worker_cards: CardSet = None
+""" Card set reused by all searches in the worker process """
+
+_worker_task = None
+""" Number of the latest task, shared with the game process. A search stops when a newer task is requested. """
+
+def _init_worker(task) -> None:
+    """
+    Set up the worker process.
+
+    Parameters:
+    - task: shared number of the latest task
+    """
+    global _worker_cards, _worker_task
+    _worker_cards = CardSet()
+    _worker_task = task
+
+def find_hint(data: bytes, task: int, max_time: float) -> tuple[tuple[int, int, int], bool]:
+    """
+    Search for a winning sequence from a position in the worker process. If there is one, its first move is
+    the hint, otherwise the preferred available move is.
+
+    Parameters:
+    - data: bytes of the state of the position
+    - task: number of the task, the search stops when it's no longer the latest task
+    - max_time: maximum number of seconds to search
+
+    Return:
+    The hint in format (src, dest, length), None if there's no more moves, and whether the position
+    can be won, None if unknown
+    """
+    _worker_cards.reset(True)
+    _worker_cards.restore(CardState(data))
+    result = solve(_worker_cards, HINT_NODES, max_time, lambda: _worker_task.value != task)
+    move = result.moves[0] if result.solvable else _worker_cards.hint()
+    return move, result.solvable
+
+class HintWorker:
+    """
+    Represent the search for hints in a worker process. Results are passed back on the Tk thread with after(),
+    and are cached by position, so asking again for the hint of a position is instant.
+    """
+
+    def __init__(self, widget, max_time: float=HINT_TIME) -> None:
+        """
+        Create a hint worker, the worker process is started at the first request.
+
+        Parameters:
+        - widget: Tk widget used to schedule the checks of the search
+        - max_time: maximum number of seconds to search for a hint
+        """
+        self.widget = widget
+        """ Tk widget used to schedule the checks of the search """
+        self.max_time = max_time
+        """ Maximum number of seconds to search for a hint """
+        self.cache: dict[CardState, tuple[tuple[int, int, int], bool]] = {}
+        """ Hints and whether the position can be won, with the states of the positions """
+        self.executor: ProcessPoolExecutor = None
+        """ Pool of the worker process, None if not started """
+        self.task = Value("q", 0, lock=False)
+        """ Number of the latest task, shared with the worker process """
+        self.state: CardState = None
+        """ State of the position being searched, None if no search is running """
+        self.future: Future = None
+        """ Result of the running search """
+        self.callbacks: list = []
+        """ Actions called with the hint and whether the position can be won when the search is done """
+        self.poll_id = None
+        """ Id returned by after() for the next check of the search """
+
+    def lookup(self, state: CardState) -> tuple[tuple[int, int, int], bool]:
+        """
+        Find the cached result of a position.
+
+        Parameters:
+        - state: the state of the position
+
+        Return:
+        The hint and whether the position can be won, None if the position is not searched
+        """
+        return self.cache.get(state)
+
+    def request(self, state: CardState, callback) -> None:
+        """
+        Find the hint of a position and whether the position can be won. The callback is called with
+        the hint in format (src, dest, length), None if there's no more moves, and whether the position
+        can be won, None if unknown. It's called at once if the result is cached.
+
+        Parameters:
+        - state: the state of the position
+        - callback: action called with the result
+        """
+        if state in self.cache:
+            callback(*self.cache[state])
+            return
+        if state == self.state:     # The search is running, the callback is called with its result
+            if callback not in self.callbacks: self.callbacks.append(callback)
+            return
+        self.cancel()
+        self.task.value += 1
+        self.state = state
+        self.callbacks = [callback]
+        try:
+            if self.executor == None:
+                self.executor = ProcessPoolExecutor(1, initializer=_init_worker, initargs=(self.task,))
+            self.future = self.executor.submit(find_hint, state.data, self.task.value, self.max_time)
+        except (OSError, RuntimeError):
+            self.future = None
+        self.poll_id = self.widget.after(POLL_DELAY, self.poll)
+
+    def poll(self) -> None:
+        """
+        Check whether the search is done. If so, cache the hint and call the callbacks.
+        """
+        self.poll_id = None
+        if self.future != None and not self.future.done():
+            self.poll_id = self.widget.after(POLL_DELAY, self.poll)
+            return
+        result = None
+        if self.future != None:
+            try:
+                result = self.future.result()
+            except Exception:   # The worker process is broken, a new one is started at the next request
+                self.executor = None
+        if result == None:  # The worker process is not available, use the preferred move instead
+            cards = CardSet()
+            cards.restore(self.state)
+            result = (cards.hint(), None)
+        if len(self.cache) >= CACHE_SIZE: del self.cache[next(iter(self.cache))]
+        state = self.state
+        self.cache[state] = result
+        self.future = None
+        # A callback may change the position, which cancels the search or starts another one.
+        # The callbacks left are dropped then, the result is only for the position searched.
+        while self.state == state and len(self.callbacks) > 0:
+            self.callbacks.pop(0)(*result)
+        if self.state == state:
+            self.state = None
+            self.callbacks = []
+
+    def cancel(self) -> None:
+        """
+        Cancel the running search, if any. The callbacks are not called.
+        """
+        if self.state != None:
+            self.task.value += 1
+            if self.future != None: self.future.cancel()
+            if self.poll_id != None: self.widget.after_cancel(self.poll_id)
+            self.state = None
+            self.future = None
+            self.callbacks = []
+            self.poll_id = None
+
+    def close(self) -> None:
+        """
+        Cancel the running search and stop the worker process.
+        """
+        self.cancel()
+        if self.executor != None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,114 @@
+from array import array
+from CardState import CardState
+
+CHECKPOINT_INTERVAL = 64
+""" Number of moves between two snapshots kept by the journal """
+
+RESTORE_COST = 16
+""" Cost of restoring a snapshot counted in steps, used to choose between stepping and restoring """
+
+def encode_step(src: int, dest: int, length: int, hidden: bool) -> int:
+    """
+    Encode a step in a 16-bit integer: 4 bits of source stack, 4 bits of destination stack,
+    6 bits of length and 1 bit of whether the card left on the source stack is hidden.
+
+    Parameters:
+    - src: the source stack
+    - dest: the destination stack
+    - length: the length of sub-stack
+    - hidden: whether the card left on the top of the source stack is hidden after the step
+
+    Return:
+    The encoded step
+    """
+    return src | dest << 4 | length << 8 | hidden << 14
+
+def decode_step(entry: int) -> tuple[int, int, int, bool]:
+    """
+    Parameters:
+    - entry: an encoded step
+
+    Return:
+    The step in format (src, dest, length, hidden)
+    """
+    return (entry & 15, entry >> 4 & 15, entry >> 8 & 63, entry >> 14 & 1 == 1)
+
+class Journal:
+    """
+    Represent the moves made in a game. A move is one or more steps, such as a move followed by
+    collecting a completed set, or dealing the remaining cards to three stacks. Undone moves are kept
+    for redo until another move is made.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create an empty journal.
+        """
+        self.entries = array("H")
+        """ Encoded steps of all moves, including the moves undone """
+        self.marks = array("I", [0])
+        """ Number of steps made by the first n moves, indexed by n """
+        self.done: int = 0
+        """ Number of moves made and not undone """
+        self.checkpoints: list[CardState] = []
+        """ Snapshots of the card set after every CHECKPOINT_INTERVAL moves, indexed by the number of moves
+        divided by CHECKPOINT_INTERVAL
+        """
+
+    def __len__(self) -> int:
+        """ Number of moves recorded, including the moves undone """
+        return len(self.marks) - 1
+
+    def clear(self) -> None:
+        """
+        Remove all moves and snapshots.
+        """
+        del self.entries[:]
+        del self.marks[1:]
+        self.done = 0
+        del self.checkpoints[:]
+
+    def begin(self) -> None:
+        """
+        Start a new move after the moves made. The moves undone are dropped.
+        """
+        if self.done < len(self.marks) - 1:
+            del self.entries[self.marks[self.done]:]
+            del self.marks[self.done + 1:]
+            del self.checkpoints[self.done // CHECKPOINT_INTERVAL + 1:]
+        self.marks.append(self.marks[-1])
+        self.done += 1
+
+    def add(self, src: int, dest: int, length: int, hidden: bool) -> None:
+        """
+        Add a step to the current move.
+
+        Parameters:
+        - src: the source stack
+        - dest: the destination stack
+        - length: the length of sub-stack
+        - hidden: whether the card left on the top of the source stack is hidden after the step
+        """
+        self.entries.append(encode_step(src, dest, length, hidden))
+        self.marks[-1] += 1
+
+    def steps(self, move_idx: int) -> list[tuple[int, int, int, bool]]:
+        """
+        Parameters:
+        - move_idx: index of the move
+
+        Return:
+        The steps of the move in format (src, dest, length, hidden), in the order they are made
+        """
+        return [decode_step(e) for e in self.entries[self.marks[move_idx]:self.marks[move_idx + 1]]]
+
+    def checkpoint(self, move_idx: int) -> int:
+        """
+        Parameters:
+        - move_idx: index of a move
+
+        Return:
+        The greatest number of moves with a snapshot not after the move, -1 if there's no snapshot
+        """
+        if len(self.checkpoints) == 0: return -1
+        return min(move_idx // CHECKPOINT_INTERVAL, len(self.checkpoints) - 1) * CHECKPOINT_INTERVAL
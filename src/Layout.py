@@ -0,0 +1,94 @@
+from Card import *
+
+MAX_IN_STACK = 16
+""" Maximum number of visible cards in a stack without shrinking the stack """
+
+GAPS: list[int] = [H_GAP if n <= MAX_IN_STACK else (H_GAP * MAX_IN_STACK) // n for n in range(53)]
+""" Horizontal gap between the top of each card of a stack, indexed by the number of cards in the stack """
+
+ROWS: list[list[int]] = [[CARD_Y + CARD_HEIGHT + H_GAP + i * GAPS[n] for i in range(n)] for n in range(53)]
+""" Y coordinate of each card of a play stack, indexed by the number of cards in the stack """
+
+COLUMNS: list[int] = [CARD_X + i * (CARD_WIDTH + V_GAP) for i in range(7)]
+""" X coordinate of the cards of each play stack """
+
+def stack_gap(length: int) -> int:
+    """
+    Find the gap between cards of a play stack, the stack shrinks when it has more cards than the maximum
+    visible number.
+
+    Parameters:
+    - length: number of cards in the stack
+
+    Return:
+    The horizontal gap between the top of each card
+    """
+    return GAPS[length]
+
+def card_position(stack_idx: int, card_idx: int, gap: int=H_GAP) -> tuple[int, int]:
+    """
+    Find the position of a card. The cards of a play stack are placed from top to bottom with the given gap,
+    the remaining cards are placed on the top-left corner and the completed sets on the top-right area.
+
+    Parameters:
+    - stack_idx: the index of the stack of the card
+    - card_idx: the index of the card in the stack
+    - gap: the horizontal gap between the top of each card on a play stack
+
+    Return:
+    The x and y coordinate of the card
+    """
+    if stack_idx < 7: return (COLUMNS[stack_idx], CARD_Y + CARD_HEIGHT + H_GAP + card_idx * gap)
+    if stack_idx == 7: return (CARD_X, CARD_Y)
+    return (CARD_X + (stack_idx - 5) * (CARD_WIDTH + V_GAP), CARD_Y)
+
+class Layout:
+    """
+    Represent the target positions of the cards. Placing a stack only reports the cards whose target
+    position changed, so the other cards are not moved again.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a layout with no card placed
+        """
+        self.targets: dict[str, tuple[int, int]] = {}
+        """ Target position of each card with the tag of the card """
+        self.changed_num: int = 0
+        """ Number of target positions changed, used to measure how many cards are moved """
+
+    def reset(self, cards: list[Card]) -> None:
+        """
+        Place all cards on the top-left corner, where cards are placed before dealing.
+
+        Parameters:
+        - cards: all cards
+        """
+        self.targets = {c.tag: (CARD_X, CARD_Y) for c in cards}
+
+    def place(self, stack: list[Card]) -> list[Card]:
+        """
+        Update the target positions of the cards of a stack.
+
+        Parameters:
+        - stack: the cards of the stack, from top to bottom
+
+        Return:
+        The cards whose target position changed, from top to bottom
+        """
+        if len(stack) == 0: return []
+        stack_idx = stack[0].stack_idx
+        if stack_idx < 7:
+            x = COLUMNS[stack_idx]
+            rows = ROWS[len(stack)]
+            positions = [(x, y) for y in rows]
+        else:
+            positions = [card_position(stack_idx, 0)] * len(stack)
+        targets = self.targets
+        changed = []
+        for c, p in zip(stack, positions):
+            if targets.get(c.tag) != p:
+                targets[c.tag] = p
+                changed.append(c)
+        self.changed_num += len(changed)
+        return changed
@@ -0,0 +1,103 @@
+"""
+Save and load games in progress.
+"""
+
+import os
+import sys
+from array import array
+from struct import Struct, error as struct_error
+from CardSet import *
+
+HEADER = Struct("<4sHqIIII")
+""" Format of the header: magic, version, seed (-1 if unknown), number of moves made, number of moves recorded,
+number of steps recorded, number of snapshots
+"""
+
+MAGIC = b"SCSV"
+""" Magic bytes at the start of a saved game """
+
+VERSION = 1
+""" Version of the saved game format """
+
+def _little_endian(a: array) -> array:
+    """
+    Parameters:
+    - a: an array in native byte order
+
+    Return:
+    The array in little-endian byte order, the same array on little-endian machines
+    """
+    if sys.byteorder == "big":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a
+
+def save_game(path: str, cards: CardSet) -> None:
+    """
+    Save a game in progress: the seed, the state at the beginning of the game, the current state,
+    and the journal with its snapshots. The file is replaced atomically.
+
+    Parameters:
+    - path: path of the saved game
+    - cards: the card set of the game
+    """
+    journal = cards.journal
+    seed = cards.seed if cards.seed != None else -1
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, seed, journal.done, len(journal), len(journal.entries),
+                            len(journal.checkpoints)))
+        f.write(cards.start.data)
+        f.write(cards.snapshot().data)
+        for state in journal.checkpoints: f.write(state.data)
+        f.write(_little_endian(journal.marks).tobytes())
+        f.write(_little_endian(journal.entries).tobytes())
+    os.replace(temp, path)
+
+def load_game(path: str, cards: CardSet) -> bool:
+    """
+    Load a saved game into a card set, the cards are not shuffled and no move is replayed.
+
+    Parameters:
+    - path: path of the saved game
+    - cards: the card set to load the game into
+
+    Return:
+    Whether the game is loaded, False if the file is missing or invalid
+    """
+    try:
+        with open(path, "rb") as f: data = f.read()
+        magic, version, seed, done, move_num, step_num, checkpoint_num = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION: raise ValueError("Not a saved game")
+        pos = HEADER.size
+        states = []
+        for _ in range(2 + checkpoint_num):
+            states.append(CardState(data[pos : pos + CardState.SIZE]))
+            pos += CardState.SIZE
+        marks = array("I")
+        marks.frombytes(data[pos : pos + (move_num + 1) * marks.itemsize])
+        pos += (move_num + 1) * marks.itemsize
+        entries = array("H")
+        entries.frombytes(data[pos : pos + step_num * entries.itemsize])
+        pos += step_num * entries.itemsize
+        if pos != len(data): raise ValueError("Saved game is truncated")
+        if done > move_num or checkpoint_num > move_num // CHECKPOINT_INTERVAL + 1:
+            raise ValueError("Saved game is corrupted")
+        marks = _little_endian(marks)
+        entries = _little_endian(entries)
+        if marks[0] != 0 or marks[-1] != step_num: raise ValueError("Saved game is corrupted")
+        for state in states:
+            if sorted(state.data[:CARD_NUM]) != list(range(CARD_NUM)) or sum(state.lengths) != CARD_NUM:
+                raise ValueError("Saved game is corrupted")
+    except (OSError, ValueError, struct_error):
+        return False
+    cards.reset(True)
+    cards.seed = seed if seed >= 0 else None
+    cards.start = states[0]
+    cards.restore(states[1])
+    journal = cards.journal
+    journal.entries = entries
+    journal.marks = marks
+    journal.done = done
+    journal.checkpoints = states[2:]
+    return True
@@ -0,0 +1,160 @@
+from CardSet import *
+from time import perf_counter
+
+class SolveResult:
+    """
+    Represent the result of solving a position
+    """
+    
+    def __init__(self, solvable: bool, moves: list[tuple[int, int, int]], nodes: int, seconds: float) -> None:
+        """
+        Create a result of solving a position.
+        
+        Parameters:
+        - solvable: True if a winning sequence is found, False if there's no way to win,
+                    None if the search runs out of budget
+        - moves: the winning sequence of moves in format (src, dest, length), empty if not found
+        - nodes: number of positions searched
+        - seconds: time taken by the search
+        """
+        self.solvable = solvable
+        """ Whether the position can be won, None if unknown """
+        self.moves = moves
+        """ The winning sequence of moves """
+        self.nodes = nodes
+        """ Number of positions searched """
+        self.seconds = seconds
+        """ Time taken by the search in seconds """
+    
+    @property
+    def nodes_per_sec(self) -> float:
+        """ Number of positions searched per second """
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+    
+    def __repr__(self) -> str:
+        return f"SolveResult(solvable={self.solvable}, moves={len(self.moves)}, nodes={self.nodes}, " \
+               f"seconds={self.seconds:.3f}, nodes_per_sec={self.nodes_per_sec:.0f})"
+
+def ordered_moves(cards: CardSet) -> list[tuple[int, int, int]]:
+    """
+    Find all available moves of a card set, with the most promising moves first:
+    moves that reveal a hidden card, moves that empty a stack, other moves onto a card, 'King'(value 13)
+    to an empty stack, and dealing the remaining cards.
+    'King' can move to every empty stack that receives a remaining card, otherwise only to the leftmost
+    empty stack, since the other stacks are equivalent.
+    
+    Parameters:
+    - cards: the card set
+    
+    Return:
+    List of moves in format (src, dest, length)
+    """
+    stacks = cards.stacks
+    reveal = []
+    empty = []
+    other = []
+    kings = []
+    # Moves onto the top card of a stack
+    cards.update_moves()
+    if cards.move_num > 0:
+        for move in cards.moves_onto:
+            if move != None:
+                below = len(stacks[move[0]]) - move[2] - 1
+                if below < 0: empty.append(move)
+                elif stacks[move[0]][below].hidden: reveal.append(move)
+                else: other.append(move)
+    # Moves of 'King' to empty stacks
+    dests = [i for i in range(7) if cards.empty_stacks >> i & 1]
+    if len(dests) > 0:
+        if len(stacks[7]) == 0 or dests[0] > 2: dests = dests[:1]
+        else: dests = [i for i in dests if i < 3] + [i for i in dests if i > 2][:1]
+        for t in range(4):
+            card = cards.by_id[t * 13 + 12]
+            if not card.hidden and card.stack_idx < 7 and card.card_idx != 0:
+                length = len(stacks[card.stack_idx]) - card.card_idx
+                for d in dests: kings.append((card.stack_idx, d, length))
+    moves = reveal + empty + other + kings
+    if len(stacks[7]) > 0: moves.append(DEAL_MOVE)
+    return moves
+
+def covered_cards(cards: CardSet, move: tuple[int, int, int]) -> list[Card]:
+    """
+    Find the cards whose blockers may be changed by a move that has just been made: the cards covered by
+    the move, and the cards one less of their types.
+    
+    Parameters:
+    - cards: the card set after the move
+    - move: the move in format (src, dest, length)
+    
+    Return:
+    The cards to check for a deadlock
+    """
+    covered = []
+    if move[0] == 7:
+        covered = [cards.stacks[i][-2] for i in range(3) if len(cards.stacks[i]) > 1]
+    else:
+        stack = cards.stacks[move[1]]
+        if len(stack) > move[2]: covered = [stack[-move[2] - 1]]
+    return covered + [cards.by_id[c.id - 1] for c in covered if c.value > 1]
+
+def solve(cards: CardSet, max_nodes: int=1000000, max_time: float=None, stop=None) -> SolveResult:
+    """
+    Search for a winning sequence of moves from the current position of a card set using depth-first search.
+    Positions already searched are skipped by a transposition table keyed on the Zobrist hash of the card set,
+    and positions in a deadlock are not searched further.
+    The card set is returned to its current position after the search.
+    
+    Parameters:
+    - cards: the card set to solve
+    - max_nodes: maximum number of positions to search
+    - max_time: maximum number of seconds to search, no limit if not given
+    - stop: function that returns True when the search should be cancelled, checked with the time budget
+    
+    Return:
+    The result of the search
+    """
+    start = perf_counter()
+    deadline = start + max_time if max_time != None else None
+    seen = {cards.zobrist}
+    path: list[tuple[int, int, int]] = []
+    todo = [iter(ordered_moves(cards))] if not cards.deadlocked() else []
+    nodes = 0
+    solvable = False
+    try:
+        while len(todo) > 0:
+            if cards.is_won():
+                solvable = True
+                break
+            move = next(todo[-1], None)
+            if move == None:    # No more moves from this position, go back to the previous position
+                todo.pop()
+                if len(path) > 0:
+                    path.pop()
+                    cards.undo()
+                continue
+            win_num = cards.win_num
+            cards.play(move)
+            nodes += 1
+            # Check the budget at every counted node, including the nodes skipped below
+            if nodes >= max_nodes or (nodes & 1023 == 0 and ((deadline != None and perf_counter() > deadline) or
+                                                             (stop != None and stop()))):
+                if cards.is_won():
+                    path.append(move)
+                    solvable = True
+                else:
+                    cards.undo()
+                    solvable = None
+                break
+            if cards.zobrist in seen:
+                cards.undo()
+                continue
+            seen.add(cards.zobrist)
+            if cards.win_num == win_num and cards.deadlocked(covered_cards(cards, move)):
+                cards.undo()
+                continue
+            path.append(move)
+            todo.append(iter(ordered_moves(cards)))
+        moves = path.copy() if solvable else []
+    finally:
+        for _ in path: cards.undo()
+    return SolveResult(solvable, moves, nodes, perf_counter() - start)
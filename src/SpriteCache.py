@@ -0,0 +1,130 @@
+import os
+from hashlib import blake2b
+from PIL import Image
+
+IMAGE_DIR = "src/img"
+""" Folder of the source images """
+
+CACHE_DIR = "src/img/cache"
+""" Folder of the cached sprite atlases """
+
+HEADER_SIZE = 32
+""" Size of the header of an atlas: the hashes of the stats and of the content of the source images in hex """
+
+def asset_stats(names: list[str]) -> str:
+    """
+    Compute the hash of the sizes and modification times of the source images, which changes whenever
+    the images may have changed. Only the file metadata is read.
+    
+    Parameters:
+    - names: names of the image files without extension, in the order of the sprites
+    
+    Return:
+    The hash in hex
+    """
+    h = blake2b(digest_size=8)
+    for name in names:
+        st = os.stat(f"{IMAGE_DIR}/{name}.png")
+        h.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+def asset_hash(names: list[str]) -> str:
+    """
+    Compute the hash of the content of the source images, used when their sizes or modification times change.
+    
+    Parameters:
+    - names: names of the image files without extension, in the order of the sprites
+    
+    Return:
+    The hash in hex
+    """
+    h = blake2b(digest_size=8)
+    for name in names:
+        h.update(name.encode())
+        with open(f"{IMAGE_DIR}/{name}.png", "rb") as f: h.update(f.read())
+    return h.hexdigest()
+
+def save_atlas(path: str, stats: str, content: str, pixels: bytes) -> None:
+    """
+    Write an atlas to the cache, the file is replaced atomically. The game still works if it can't be saved.
+    
+    Parameters:
+    - path: path of the atlas
+    - stats: hash of the sizes and modification times of the source images
+    - content: hash of the content of the source images
+    - pixels: raw pixels of the atlas
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path + ".tmp", "wb") as f: f.write((stats + content).encode() + pixels)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+
+def update_stats(path: str, stats: str) -> None:
+    """
+    Replace the hash of the sizes and modification times at the start of a cached atlas, when the source
+    images are touched but their content is the same. The pixels are not written again.
+    
+    Parameters:
+    - path: path of the atlas
+    - stats: hash of the sizes and modification times of the source images
+    """
+    try:
+        with open(path, "r+b") as f: f.write(stats.encode())
+    except OSError:
+        pass
+
+def build_atlas(names: list[str], width: int, height: int) -> Image.Image:
+    """
+    Resize the source images and place them in a vertical strip.
+    
+    Parameters:
+    - names: names of the image files without extension
+    - width: width of a sprite
+    - height: height of a sprite
+    
+    Return:
+    The atlas
+    """
+    atlas = Image.new("RGBA", (width, height * len(names)))
+    for i, name in enumerate(names):
+        image = Image.open(f"{IMAGE_DIR}/{name}.png").convert("RGBA")
+        atlas.paste(image.resize((width, height), resample=Image.LANCZOS), (0, i * height))
+    return atlas
+
+def load_sprites(names: list[str], width: int, height: int) -> dict[str, Image.Image]:
+    """
+    Load the resized images from the cached atlas of raw pixels with one read. The source images are only
+    checked by their sizes and modification times, their content is hashed if those change, and the atlas
+    is built and saved again if the content has changed or the cache is missing.
+    
+    Parameters:
+    - names: names of the image files without extension
+    - width: width of a sprite
+    - height: height of a sprite
+    
+    Return:
+    The sprites with names
+    """
+    path = f"{CACHE_DIR}/sprites-{width}x{height}.rgba"
+    size = (width, height * len(names))
+    pixel_num = size[0] * size[1] * 4
+    stats = asset_stats(names)
+    try:
+        with open(path, "rb") as f: data = f.read()
+    except OSError:
+        data = b""
+    # The atlas starts with the hashes of the stats and the content of the source images, 16 hex digits each
+    pixels = data[HEADER_SIZE:] if len(data) == HEADER_SIZE + pixel_num else None
+    if pixels != None and data[:16] == stats.encode():
+        atlas = Image.frombytes("RGBA", size, pixels)
+    else:   # The images may have changed, the content is hashed only in this case
+        content = asset_hash(names)
+        if pixels != None and data[16:HEADER_SIZE] == content.encode():
+            atlas = Image.frombytes("RGBA", size, pixels)
+            update_stats(path, stats)
+        else:
+            atlas = build_atlas(names, width, height)
+            save_atlas(path, stats, content, atlas.tobytes())
+    return {name: atlas.crop((0, i * height, width, (i + 1) * height)) for i, name in enumerate(names)}
@@ -0,0 +1,201 @@
+"""
+Strategies that play games without the game window.
+"""
+
+from abc import ABC, abstractmethod
+from Solver import *
+
+MAX_MOVES = 1000
+""" Maximum number of moves a strategy makes in a game """
+
+class Strategy(ABC):
+    """
+    Represent a policy that picks the next move of a game. Subclasses implement choose().
+    """
+
+    name = "strategy"
+    """ Name of the strategy """
+
+    def start(self, cards: CardSet) -> None:
+        """
+        Prepare for a new game, called after the cards are dealt.
+
+        Parameters:
+        - cards: the card set of the game
+        """
+        pass
+
+    @abstractmethod
+    def choose(self, cards: CardSet) -> tuple[int, int, int]:
+        """
+        Pick the next move. The card set must be in the same position when it returns.
+
+        Parameters:
+        - cards: the card set of the game
+
+        Return:
+        The move in format (src, dest, length), None to stop playing
+        """
+
+class GreedyStrategy(Strategy):
+    """
+    Make the move given by the hint: 'King' to an empty stack, moves to the stacks from left to right,
+    and dealing the remaining cards.
+    """
+
+    name = "greedy"
+
+    def choose(self, cards: CardSet) -> tuple[int, int, int]:
+        return cards.hint()
+
+class RevealStrategy(Strategy):
+    """
+    Make the move that reveals a hidden card or empties a stack first, then the move given by the hint.
+    The remaining cards are dealt only if there's no other move.
+    """
+
+    name = "reveal"
+
+    def choose(self, cards: CardSet) -> tuple[int, int, int]:
+        moves = cards.legal_moves()
+        if len(moves) == 0: return None
+        for src, dest, length in moves:
+            if src < 7 and length == len(cards.stacks[src]): return (src, dest, length)
+        for src, dest, length in moves:
+            if src < 7 and cards.stacks[src][-length - 1].hidden: return (src, dest, length)
+        return moves[0]
+
+def score(cards: CardSet) -> int:
+    """
+    Parameters:
+    - cards: the card set to score
+
+    Return:
+    How promising the position is: completed sets first, then cards revealed, then cards on their next card
+    """
+    return 1000 * cards.win_num + 10 * sum(not c.hidden for c in cards.by_id) + cards.sequenced
+
+class LookaheadStrategy(Strategy):
+    """
+    Make the move that leads to the best score within a number of moves. Ties go to the move given first
+    by legal_moves().
+    """
+
+    name = "lookahead"
+
+    def __init__(self, depth: int=2) -> None:
+        """
+        Parameters:
+        - depth: number of moves to look ahead
+        """
+        self.depth = depth
+        """ Number of moves to look ahead """
+
+    def best_score(self, cards: CardSet, depth: int) -> int:
+        """
+        Parameters:
+        - cards: the card set
+        - depth: number of moves left to look ahead
+
+        Return:
+        The best score reached from the current position
+        """
+        best = score(cards)
+        if depth == 0 or cards.is_won(): return best
+        for move in cards.legal_moves():
+            cards.play(move)
+            best = max(best, self.best_score(cards, depth - 1))
+            cards.undo()
+        return best
+
+    def choose(self, cards: CardSet) -> tuple[int, int, int]:
+        best = None
+        best_score = -1
+        for move in cards.legal_moves():
+            cards.play(move)
+            s = self.best_score(cards, self.depth - 1)
+            cards.undo()
+            if s > best_score:
+                best = move
+                best_score = s
+        return best
+
+class SolverStrategy(Strategy):
+    """
+    Follow the winning sequence found by the solver, searching again if the position changes.
+    The hint is used if the search runs out of budget, and the game stops if it can't be won.
+    """
+
+    name = "solver"
+
+    def __init__(self, max_nodes: int=20000) -> None:
+        """
+        Parameters:
+        - max_nodes: maximum number of positions searched for each plan
+        """
+        self.max_nodes = max_nodes
+        """ Maximum number of positions searched for each plan """
+        self.plan: list[tuple[int, int, int]] = []
+        """ The moves left in the winning sequence, reversed """
+        self.expected: int = None
+        """ Zobrist hash of the position the plan continues from """
+
+    def start(self, cards: CardSet) -> None:
+        self.plan = []
+        self.expected = None
+
+    def choose(self, cards: CardSet) -> tuple[int, int, int]:
+        if len(self.plan) == 0 or cards.zobrist != self.expected:
+            result = solve(cards, self.max_nodes)
+            if result.solvable == False: return None
+            self.plan = list(reversed(result.moves))
+        if len(self.plan) == 0:
+            self.expected = None
+            return cards.hint()
+        move = self.plan.pop()
+        cards.play(move)
+        self.expected = cards.zobrist
+        cards.undo()
+        return move
+
+STRATEGIES: dict[str, type] = {s.name: s for s in [GreedyStrategy, RevealStrategy, LookaheadStrategy, SolverStrategy]}
+""" Classes of the strategies with names """
+
+def make_strategy(spec: str) -> Strategy:
+    """
+    Create a strategy from its name, with an optional integer parameter after a colon, such as 'lookahead:3'.
+
+    Parameters:
+    - spec: name and parameter of the strategy
+
+    Return:
+    The strategy
+    """
+    name, _, arg = spec.partition(":")
+    if name not in STRATEGIES: raise ValueError(f"Unknown strategy {name}, choose from {', '.join(STRATEGIES)}")
+    return STRATEGIES[name](int(arg)) if arg != "" else STRATEGIES[name]()
+
+def play_game(strategy: Strategy, cards: CardSet, seed: int, max_moves: int=MAX_MOVES) -> tuple[bool, int]:
+    """
+    Deal a game and play it with a strategy until it's won, the strategy stops, there's no more moves,
+    or the game is deadlocked.
+
+    Parameters:
+    - strategy: the strategy to play with
+    - cards: the card set to play on
+    - seed: seed of the deal
+    - max_moves: maximum number of moves
+
+    Return:
+    Whether the game is won and the number of moves made
+    """
+    cards.reset(True)
+    cards.deal(seed)
+    strategy.start(cards)
+    moves = 0
+    while moves < max_moves and not cards.is_won() and not cards.deadlocked():
+        move = strategy.choose(cards)
+        if move == None: break
+        cards.play(move)
+        moves += 1
+    return cards.is_won(), moves
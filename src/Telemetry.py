@@ -0,0 +1,163 @@
+import json
+from time import perf_counter
+
+BUCKETS = [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+""" Upper bounds of the buckets of the histograms in milliseconds, longer times go to an extra bucket """
+
+class Histogram:
+    """
+    Represent a histogram of times with buckets of doubling size
+    """
+
+    def __init__(self) -> None:
+        """
+        Create an empty histogram
+        """
+        self.counts: list[int] = [0] * (len(BUCKETS) + 1)
+        """ Number of times in each bucket """
+        self.num: int = 0
+        """ Number of times recorded """
+        self.total: float = 0.0
+        """ Sum of the times recorded in milliseconds """
+        self.max: float = 0.0
+        """ Longest time recorded in milliseconds """
+
+    def add(self, ms: float) -> None:
+        """
+        Record a time.
+
+        Parameters:
+        - ms: the time in milliseconds
+        """
+        i = 0
+        while i < len(BUCKETS) and ms > BUCKETS[i]: i += 1
+        self.counts[i] += 1
+        self.num += 1
+        self.total += ms
+        if ms > self.max: self.max = ms
+
+    def percentile(self, p: float) -> float:
+        """
+        Parameters:
+        - p: the percentile, from 0 to 100
+
+        Return:
+        The upper bound of the bucket of the percentile in milliseconds, the longest time for the extra bucket
+        """
+        if self.num == 0: return 0.0
+        rank = p / 100 * self.num
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n > 0: return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        """
+        Return:
+        The histogram as a dictionary for JSON
+        """
+        return {"num": self.num, "mean": self.total / self.num if self.num > 0 else 0.0, "max": self.max,
+                "p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99),
+                "buckets": BUCKETS, "counts": self.counts}
+
+class Telemetry:
+    """
+    Represent the times recorded while the game runs: the time taken by the event handlers, the frames of
+    the animations and the number of pending after() callbacks. Nothing is recorded unless it's enabled.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create an empty record
+        """
+        self.handlers: dict[str, Histogram] = {}
+        """ Time taken by each event handler, with the names of the handlers """
+        self.frames: Histogram = Histogram()
+        """ Time taken to draw each frame """
+        self.lateness: Histogram = Histogram()
+        """ Time between when each frame is due and when it's drawn """
+        self.dropped_frames: int = 0
+        """ Number of frame periods skipped because frames are late """
+        self.pending: int = 0
+        """ Number of pending after() callbacks at the last sample """
+        self.max_pending: int = 0
+        """ Greatest number of pending after() callbacks sampled """
+        self.start: float = perf_counter()
+        """ Time the recording starts """
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Record the time taken by an event handler.
+
+        Parameters:
+        - name: name of the handler
+        - seconds: the time taken in seconds
+        """
+        histogram = self.handlers.get(name)
+        if histogram == None: histogram = self.handlers[name] = Histogram()
+        histogram.add(seconds * 1000)
+
+    def wrap(self, name: str, action):
+        """
+        Parameters:
+        - name: name of the handler
+        - action: the event handler
+
+        Return:
+        The handler that records the time taken by the given handler
+        """
+        def timed(*args):
+            start = perf_counter()
+            try:
+                return action(*args)
+            finally:
+                self.record(name, perf_counter() - start)
+        return timed
+
+    def frame(self, lateness: float, cost: float, period: float) -> None:
+        """
+        Record an animation frame.
+
+        Parameters:
+        - lateness: seconds between when the frame is due and when it starts
+        - cost: seconds taken to draw the frame
+        - period: seconds between frames
+        """
+        self.frames.add(cost * 1000)
+        self.lateness.add(max(lateness, 0.0) * 1000)
+        if lateness > period: self.dropped_frames += int(lateness / period)
+
+    def sample_pending(self, widget) -> None:
+        """
+        Count the after() callbacks waiting to run.
+
+        Parameters:
+        - widget: any Tk widget of the application
+        """
+        self.pending = len(widget.tk.splitlist(widget.tk.call("after", "info")))
+        if self.pending > self.max_pending: self.max_pending = self.pending
+
+    def summary(self) -> str:
+        """
+        Return:
+        A short text of the times recorded, one line per handler
+        """
+        lines = [f"{'':<10}{'num':>7}{'p50':>8}{'p95':>8}{'max':>8} ms"]
+        for name, h in list(self.handlers.items()) + [("frame", self.frames), ("late", self.lateness)]:
+            lines.append(f"{name:<10}{h.num:>7}{h.percentile(50):>8.2f}{h.percentile(95):>8.2f}{h.max:>8.2f}")
+        lines.append(f"dropped frames {self.dropped_frames}, pending after {self.pending} (max {self.max_pending})")
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        """
+        Write the times recorded to a JSON file.
+
+        Parameters:
+        - path: path of the file
+        """
+        report = {"seconds": perf_counter() - self.start,
+                  "handlers": {name: h.to_dict() for name, h in self.handlers.items()},
+                  "frames": self.frames.to_dict(), "lateness": self.lateness.to_dict(),
+                  "dropped_frames": self.dropped_frames, "max_pending": self.max_pending}
+        with open(path, "w") as f: json.dump(report, f, indent=2)
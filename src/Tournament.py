@@ -0,0 +1,94 @@
+"""
+Play strategies against each other on the same deals in parallel.
+
+Usage: python src/Tournament.py [STRATEGY ...] [--start N] [--count N] [--workers N] [--max-moves N]
+where STRATEGY is a name such as greedy, reveal, lookahead or solver, with an optional parameter such as lookahead:3.
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from time import perf_counter
+from Strategy import *
+
+_worker_cards: CardSet = None
+""" Card set reused by all games played in a worker process """
+
+_worker_strategies: dict[str, Strategy] = None
+""" Strategies created in a worker process, with their specs """
+
+_worker_max_moves: int = MAX_MOVES
+""" Maximum number of moves per game in a worker process """
+
+def _init_worker(max_moves: int) -> None:
+    """
+    Set up a worker process.
+
+    Parameters:
+    - max_moves: maximum number of moves per game
+    """
+    global _worker_cards, _worker_strategies, _worker_max_moves
+    _worker_cards = CardSet()
+    _worker_strategies = {}
+    _worker_max_moves = max_moves
+
+def play(task: tuple[str, int]) -> tuple[str, int, bool, int, float]:
+    """
+    Play a game with a strategy in a worker process.
+
+    Parameters:
+    - task: the spec of the strategy and the seed of the deal
+
+    Return:
+    The result in format (spec, seed, won, number of moves, seconds)
+    """
+    spec, seed = task
+    strategy = _worker_strategies.get(spec)
+    if strategy == None: strategy = _worker_strategies[spec] = make_strategy(spec)
+    start = perf_counter()
+    won, moves = play_game(strategy, _worker_cards, seed, _worker_max_moves)
+    return spec, seed, won, moves, perf_counter() - start
+
+def main(argv: list[str]=None) -> None:
+    """
+    Play every strategy on the deals of a range of seeds and print the win rate, average number of moves
+    and games per second of worker time of each strategy.
+    """
+    parser = ArgumentParser(description="Play Scorpion Solitaire strategies on the same deals.")
+    parser.add_argument("strategies", nargs="*", default=list(STRATEGIES), help="strategies to play")
+    parser.add_argument("--start", type=int, default=0, help="first seed")
+    parser.add_argument("--count", type=int, default=100, help="number of seeds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--max-moves", type=int, default=MAX_MOVES, help="maximum moves per game")
+    args = parser.parse_args(argv)
+    for spec in args.strategies:
+        try:
+            make_strategy(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    seeds = range(args.start, args.start + args.count)
+    tasks = [(spec, seed) for seed in seeds for spec in args.strategies]
+    stats = {spec: [0, 0, 0, 0.0] for spec in args.strategies}     # Games, wins, moves, seconds
+    start = perf_counter()
+    with Pool(args.workers, _init_worker, (args.max_moves,)) as pool:
+        for spec, seed, won, moves, seconds in pool.imap_unordered(play, tasks, chunksize=4):
+            s = stats[spec]
+            s[0] += 1
+            s[1] += won
+            s[2] += moves
+            s[3] += seconds
+    wall = perf_counter() - start
+
+    # Games per second of a worker, the time of each game is measured in the worker that plays it
+    print(f"{'strategy':<16}{'games':>7}{'wins':>7}{'win rate':>10}{'moves':>8}{'games/worker-sec':>18}")
+    for spec, (games, wins, moves, seconds) in stats.items():
+        print(f"{spec:<16}{games:>7}{wins:>7}{wins / games:>10.1%}{moves / games:>8.1f}"
+              f"{games / seconds if seconds > 0 else 0:>18.1f}")
+    print(f"{len(tasks)} games in {wall:.1f} seconds, {len(tasks) / wall:.1f} games/sec with {args.workers} workers",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Record the actions of games to compact traces and replay them without the game window.
+
+Usage: python src/Trace.py TRACE [TRACE ...]
+where TRACE is a trace file or a folder of trace files. Each trace is replayed and its final state is verified.
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from array import array
+from struct import Struct, error as struct_error
+from time import perf_counter
+from CardSet import *
+from Journal import encode_step, decode_step
+
+HEADER = Struct("<4sHqI")
+""" Format of the header: magic, version, seed (-1 if unknown), number of actions. The header is followed by
+the state at the beginning of the trace, the actions and the final state.
+"""
+
+MAGIC = b"SCTR"
+""" Magic bytes at the start of a trace """
+
+VERSION = 1
+""" Version of the trace format """
+
+MOVE = 0
+""" Kind of action that moves cards in format (src, dest, length), including dealing the remaining cards """
+
+UNDO = 1
+""" Kind of action that undoes the previous move """
+
+REDO = 2
+""" Kind of action that makes the last move undone again """
+
+RESTART = 3
+""" Kind of action that restarts the game """
+
+class Trace:
+    """
+    Represent the actions taken in a game from a start state. Each action is a 16-bit integer: a move encoded
+    like the steps of the journal, with the kind of action in the top 2 bits instead of whether a card is hidden.
+    """
+
+    def __init__(self, seed: int, start: CardState) -> None:
+        """
+        Create an empty trace.
+
+        Parameters:
+        - seed: seed of the deal, None if unknown
+        - start: the state at the beginning of the game
+        """
+        self.seed = seed
+        """ Seed of the deal, None if unknown """
+        self.start = start
+        """ The state at the beginning of the game """
+        self.actions = array("H")
+        """ Encoded actions in the order they are taken """
+        self.final: CardState = None
+        """ The state after the last action, set when the trace is saved or loaded """
+
+    @staticmethod
+    def from_game(cards: CardSet) -> "Trace":
+        """
+        Create a trace that reaches the current position of a game from its beginning, including the moves
+        that can be redone: all moves in the journal followed by undoing the moves undone.
+
+        Parameters:
+        - cards: the card set of the game
+
+        Return:
+        The trace
+        """
+        trace = Trace(cards.seed, cards.start)
+        journal = cards.journal
+        for i in range(len(journal)):
+            src, dest, length, _ = journal.steps(i)[0]
+            trace.add(MOVE, *(DEAL_MOVE if src == 7 else (src, dest, length)))
+        for _ in range(len(journal) - journal.done): trace.add(UNDO)
+        return trace
+
+    def __len__(self) -> int:
+        """ Number of actions """
+        return len(self.actions)
+
+    def add(self, kind: int, src: int=0, dest: int=0, length: int=0) -> None:
+        """
+        Add an action.
+
+        Parameters:
+        - kind: kind of the action, MOVE, UNDO, REDO or RESTART
+        - src: the source stack of a move
+        - dest: the destination stack of a move
+        - length: the number of cards of a move
+        """
+        self.actions.append(encode_step(src, dest, length, False) | kind << 14)
+
+    def save(self, path: str, final: CardState) -> None:
+        """
+        Write the trace to a file, the file is replaced atomically.
+
+        Parameters:
+        - path: path of the trace
+        - final: the state after the last action
+        """
+        self.final = final
+        actions = self.actions
+        if sys.byteorder == "big":
+            actions = array("H", actions)
+            actions.byteswap()
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed if self.seed != None else -1, len(actions)))
+            f.write(self.start.data)
+            f.write(actions.tobytes())
+            f.write(final.data)
+        os.replace(temp, path)
+
+    @staticmethod
+    def load(path: str) -> "Trace":
+        """
+        Read a trace from a file.
+
+        Parameters:
+        - path: path of the trace
+
+        Return:
+        The trace
+        """
+        with open(path, "rb") as f: data = f.read()
+        try:
+            magic, version, seed, num = HEADER.unpack_from(data)
+        except struct_error:
+            raise ValueError(f"{path} is not a trace")
+        if magic != MAGIC or version != VERSION: raise ValueError(f"{path} is not a trace")
+        if len(data) != HEADER.size + 2 * CardState.SIZE + 2 * num: raise ValueError(f"{path} is truncated")
+        pos = HEADER.size
+        trace = Trace(seed if seed >= 0 else None, CardState(data[pos : pos + CardState.SIZE]))
+        pos += CardState.SIZE
+        trace.actions.frombytes(data[pos : pos + 2 * num])
+        if sys.byteorder == "big": trace.actions.byteswap()
+        trace.final = CardState(data[pos + 2 * num:])
+        return trace
+
+def replay(trace: Trace, cards: CardSet=None) -> CardSet:
+    """
+    Take the actions of a trace from its start state without animation. Every move is checked, and
+    the final state is verified if it's known.
+
+    Parameters:
+    - trace: the trace to replay
+    - cards: the card set to replay on, create a new one if not given
+
+    Return:
+    The card set after the last action
+    """
+    if cards == None: cards = CardSet()
+    cards.reset(True)
+    cards.deal(trace.seed, trace.start)
+    for i, action in enumerate(trace.actions):
+        kind = action >> 14
+        if kind == MOVE:
+            move = decode_step(action)[:3]
+            if move[0] == 7: legal = move == DEAL_MOVE and len(cards.stacks[7]) == 3
+            else: legal = 0 < move[2] <= len(cards.stacks[move[0]]) and \
+                          cards.can_move(cards.stacks[move[0]][-move[2]], move[1])
+            if not legal: raise ValueError(f"Action {i} is an invalid move {move}")
+            cards.play(move)
+        elif kind == UNDO:
+            cards.undo()
+        elif kind == REDO:
+            cards.redo()
+        else:
+            cards.reset(False)
+            cards.deal()
+    if trace.final != None and cards.snapshot() != trace.final:
+        raise ValueError(f"The final state doesn't match after {len(trace)} actions")
+    return cards
+
+def main(argv: list[str]=None) -> None:
+    """
+    Replay trace files and verify their final states.
+    """
+    parser = ArgumentParser(description="Replay and verify Scorpion Solitaire traces.")
+    parser.add_argument("traces", nargs="+", help="trace files or folders of trace files")
+    args = parser.parse_args(argv)
+    paths = []
+    for p in args.traces:
+        if os.path.isdir(p): paths.extend(os.path.join(p, name) for name in sorted(os.listdir(p)) if name.endswith(".sctr"))
+        else: paths.append(p)
+
+    cards = CardSet()
+    start = perf_counter()
+    actions = 0
+    failed = 0
+    for path in paths:
+        try:
+            trace = Trace.load(path)
+            replay(trace, cards)
+            actions += len(trace)
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(f"{path}: {e}", file=sys.stderr)
+    seconds = perf_counter() - start
+    print(f"{len(paths) - failed}/{len(paths)} traces verified, {actions} actions, "
+          f"{actions / seconds if seconds > 0 else 0:.0f} actions/sec", file=sys.stderr)
+    if failed > 0: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
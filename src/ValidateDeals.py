@@ -0,0 +1,109 @@
+"""
+Validate deals for solvability in parallel.
+
+Usage: python src/ValidateDeals.py OUTPUT [--start N] [--count N] [--workers N] [--max-nodes N] [--max-time S]
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from struct import Struct
+from time import perf_counter
+from Solver import *
+
+RECORD = Struct("<QbHIf")
+""" Format of a result: seed, solvable (1 yes, 0 no, -1 unknown), solution length, nodes searched, seconds """
+
+_worker_cards: CardSet = None
+""" Card set reused by all deals solved in a worker process """
+
+_worker_budget: tuple[int, float] = None
+""" Maximum number of nodes and seconds to solve a deal in a worker process """
+
+def _init_worker(max_nodes: int, max_time: float) -> None:
+    """
+    Set up a worker process.
+    
+    Parameters:
+    - max_nodes: maximum number of positions to search per deal
+    - max_time: maximum number of seconds to search per deal
+    """
+    global _worker_cards, _worker_budget
+    _worker_cards = CardSet()
+    _worker_budget = (max_nodes, max_time)
+
+def validate(seed: int) -> bytes:
+    """
+    Deal the cards from a seed and solve the deal in a worker process.
+    
+    Parameters:
+    - seed: seed of the deal
+    
+    Return:
+    The packed result
+    """
+    start = perf_counter()
+    _worker_cards.reset(True)
+    _worker_cards.deal(seed)
+    result = solve(_worker_cards, *_worker_budget)
+    solvable = -1 if result.solvable == None else int(result.solvable)
+    return RECORD.pack(seed, solvable, len(result.moves), result.nodes, perf_counter() - start)
+
+def read_results(path: str) -> list[tuple[int, int, int, int, float]]:
+    """
+    Read the results in an output file. An incomplete result at the end of the file is ignored.
+    
+    Parameters:
+    - path: path of the output file
+    
+    Return:
+    List of results in format (seed, solvable, solution length, nodes, seconds)
+    """
+    if not os.path.exists(path): return []
+    with open(path, "rb") as f: data = f.read()
+    end = len(data) - len(data) % RECORD.size
+    return list(RECORD.iter_unpack(data[:end]))
+
+def main(argv: list[str]=None) -> None:
+    """
+    Solve the deals of a range of seeds and append the results to the output file.
+    Seeds that already have a result in the output file are skipped, so an interrupted run can be resumed.
+    """
+    parser = ArgumentParser(description="Validate Scorpion Solitaire deals for solvability.")
+    parser.add_argument("output", help="file the results are appended to")
+    parser.add_argument("--start", type=int, default=0, help="first seed")
+    parser.add_argument("--count", type=int, default=1000, help="number of seeds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--max-nodes", type=int, default=1000000, help="maximum positions searched per deal")
+    parser.add_argument("--max-time", type=float, default=None, help="maximum seconds searched per deal")
+    args = parser.parse_args(argv)
+    
+    # Drop an incomplete result left by an interrupted run and skip the seeds done
+    results = read_results(args.output)
+    if os.path.exists(args.output): os.truncate(args.output, len(results) * RECORD.size)
+    done = {r[0] for r in results}
+    seeds = [s for s in range(args.start, args.start + args.count) if s not in done]
+    print(f"{len(seeds)} deals to validate, {args.count - len(seeds)} done", file=sys.stderr)
+    
+    start = perf_counter()
+    num = 0
+    solved = 0
+    dead = 0
+    with open(args.output, "ab") as f, \
+            Pool(args.workers, _init_worker, (args.max_nodes, args.max_time)) as pool:
+        for record in pool.imap_unordered(validate, seeds, chunksize=16):
+            f.write(record)
+            num += 1
+            seed, solvable, length, nodes, seconds = RECORD.unpack(record)
+            if solvable == 1: solved += 1
+            if solvable == 0 and nodes == 0: dead += 1     # Deadlocked deals are found without searching
+            if num % 1000 == 0 or num == len(seeds):
+                f.flush()
+                rate = num / (perf_counter() - start)
+                print(f"{num}/{len(seeds)} deals, {solved} solvable, {dead} deadlocked, {rate:.1f} deals/sec, "
+                      f"{rate / args.workers:.1f} deals/sec per worker", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ build_options = {
     'packages': [], 
     'excludes': [],
     'optimize': 2,
-    'includes': ['Card', 'CardSet', 'GameCanvas']
+    'includes': ['Card', 'CardSet', 'CardState', 'DealGenerator', 'DealLibrary', 'GameCanvas', 'HintWorker', 'Journal', 'Layout', 'SaveGame', 'Solver', 'SpriteCache', 'Telemetry', 'Trace']
 }
 
 import sys